@@ -0,0 +1,149 @@
+"""Read and write compressed RDF without a round trip through the disk.
+
+Usage::
+
+  from pathlib import Path
+  from pymantic.parsers import ntriples_parser
+  from pymantic.serializers import serialize_nquads
+
+  graph = ntriples_parser.parse(Path("dump.nt.gz"))
+  with open("dump.nt.bz2", "rb") as f:
+      graph = ntriples_parser.parse(f)
+  serialize_nquads(dataset, Path("dump.nq.xz"))
+
+The parsers accept a path (any :py:class:`os.PathLike`, since a string is
+parsed as a document) or a binary file-like object, and recognize gzip, bzip2,
+xz and zstd compression from the first bytes of the data. The serializers
+accept a path, compressing it according to its extension, or a binary
+file-like object and a ``compression`` argument.
+
+zstd needs the `zstandard <https://pypi.org/project/zstandard/>`_ package."""
+
+__all__ = ["sniff_compression", "open_input", "open_output"]
+
+import bz2
+from contextlib import contextmanager
+import gzip
+import io
+import lzma
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_BUFFER_SIZE = 1 << 20
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def _zstandard():
+    if zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package")
+    return zstandard
+
+
+# Each of these wraps a binary file-like object, and doesn't close it when it
+# is closed itself.
+_DECOMPRESSORS = {
+    "gzip": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    "bz2": lambda f: bz2.BZ2File(f, mode="rb"),
+    "xz": lambda f: lzma.LZMAFile(f, mode="rb"),
+    "zstd": lambda f: _zstandard().ZstdDecompressor().stream_reader(f, closefd=False),
+}
+
+_COMPRESSORS = {
+    "gzip": lambda f: gzip.GzipFile(fileobj=f, mode="wb"),
+    "bz2": lambda f: bz2.BZ2File(f, mode="wb"),
+    "xz": lambda f: lzma.LZMAFile(f, mode="wb"),
+    "zstd": lambda f: _zstandard().ZstdCompressor().stream_writer(f, closefd=False),
+}
+
+
+def sniff_compression(head):
+    """Return the name of the compression ("gzip", "bz2", "xz" or "zstd") of
+    data starting with the bytes head, or None if it isn't compressed."""
+    for magic, compression in _MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _is_binary(f):
+    return isinstance(f, (io.BufferedIOBase, io.RawIOBase))
+
+
+@contextmanager
+def open_input(source):
+    """Open source, a path, bytes or binary file-like object, as a text
+    stream of its contents, decompressing it if it is compressed. Anything
+    else, like a string or a text stream, is passed through unchanged.
+
+    Line endings are left as they are, and source is left open."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            with open_input(f) as stream:
+                yield stream
+        return
+    if not _is_binary(source):
+        yield source
+        return
+    buffered = source if hasattr(source, "peek") else io.BufferedReader(source)
+    compression = sniff_compression(buffered.peek(6))
+    if compression is None:
+        binary = buffered
+    else:
+        binary = io.BufferedReader(_DECOMPRESSORS[compression](buffered), _BUFFER_SIZE)
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    try:
+        yield text
+    finally:
+        # Detach rather than close the wrappers around source.
+        text.detach()
+        if compression is not None:
+            binary.close()
+        if buffered is not source:
+            buffered.detach()
+
+
+@contextmanager
+def open_output(target, compression=None):
+    """Open target, a path or binary file-like object, as a text stream which
+    writes to it compressed with compression ("gzip", "bz2", "xz", "zstd" or
+    None). The compression of a path defaults to the one its extension names.
+    Anything else, like a text stream, is passed through unchanged.
+
+    A file-like target is flushed but left open."""
+    if isinstance(target, os.PathLike):
+        if compression is None:
+            compression = _EXTENSIONS.get(os.path.splitext(target)[1])
+        with open(target, "wb") as f:
+            with open_output(f, compression) as stream:
+                yield stream
+        return
+    if not _is_binary(target):
+        yield target
+        return
+    if compression is None:
+        binary = target
+    else:
+        binary = io.BufferedWriter(_COMPRESSORS[compression](target), _BUFFER_SIZE)
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    try:
+        yield text
+    finally:
+        text.flush()
+        text.detach()
+        if compression is not None:
+            binary.close()
+        target.flush()
@@ -0,0 +1,208 @@
+"""A compact binary file format for graphs, which is opened with `mmap`
+rather than parsed, so that a large graph is available as soon as the file is
+opened and its pages are shared by every process that opens it.
+
+Usage::
+
+  from pymantic.mapped import MappedGraph, serialize_mapped
+
+  with open("graph.bin", "wb") as f:
+      serialize_mapped(graph, f)
+
+  # Later, or in another process:
+  graph = MappedGraph("graph.bin")
+
+The file holds a sorted term dictionary and the triples as sorted SPO, POS
+and OSP permutations of term IDs, the same layout a
+:py:class:`~pymantic.primitives.CompactGraph` keeps in memory, and a
+`MappedGraph` answers :py:meth:`~MappedGraph.match` directly from the mapped
+pages."""
+
+__all__ = ["serialize_mapped", "MappedGraph"]
+
+from array import array
+import mmap
+from operator import itemgetter
+import struct
+import sys
+
+from pymantic.primitives import BlankNode, CompactGraph, Literal, NamedNode
+
+_MAGIC = b"PYMRDF\x00\x01"
+
+# Magic, byte order (b"l" or b"b"), padding, term count and triple count.
+_HEADER = struct.Struct("=8sc7xqq")
+
+_BYTE_ORDER = sys.byteorder[:1].encode("ascii")
+
+_ITEM = array("q").itemsize
+
+
+def _encode_term(term, blank_labels):
+    if isinstance(term, Literal):
+        return b"\x00".join(
+            (
+                b"l" + (term.language or "").encode("utf-8"),
+                (term.datatype or "").encode("utf-8"),
+                term.value.encode("utf-8"),
+            )
+        )
+    elif isinstance(term, BlankNode):
+        label = blank_labels.setdefault(term, str(len(blank_labels)))
+        return b"b" + label.encode("ascii")
+    return b"u" + str(term).encode("utf-8")
+
+
+def serialize_mapped(graph, f):
+    """Serialize graph to the binary file f in the format read by
+    :py:class:`MappedGraph`."""
+    blank_labels = {}
+    ids = {}
+    rows = []
+    for triple in graph:
+        row = []
+        for term in triple:
+            encoded = ids.get(term)
+            if encoded is None:
+                encoded = ids[term] = _encode_term(term, blank_labels)
+            row.append(encoded)
+        rows.append(row)
+    # Number the terms in the order of their encodings, so that they can be
+    # looked up with a binary search.
+    encodings = sorted(set(ids.values()))
+    term_ids = {encoded: i for i, encoded in enumerate(encodings)}
+    keys = [(term_ids[row[0]], term_ids[row[1]], term_ids[row[2]]) for row in rows]
+    del ids, rows
+
+    offsets = array("q", [0])
+    for encoded in encodings:
+        offsets.append(offsets[-1] + len(encoded))
+    written = f.write(_HEADER.pack(_MAGIC, _BYTE_ORDER, len(encodings), len(keys)))
+    written += f.write(offsets.tobytes())
+    for encoded in encodings:
+        written += f.write(encoded)
+    f.write(b"\x00" * (-written % _ITEM))
+    for order in (CompactGraph._SPO, CompactGraph._POS, CompactGraph._OSP):
+        inverse = sorted(range(3), key=order.__getitem__)
+        permuted = sorted(itemgetter(*inverse)(key) for key in keys)
+        for i in range(3):
+            f.write(array("q", map(itemgetter(i), permuted)).tobytes())
+
+
+class _MappedTerms:
+    """The term dictionary of a `MappedGraph`: a sorted table of encoded
+    terms in the mapped file, decoded on demand."""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._blanks = {}
+        self._blank_ids = {}
+
+    def _encoded(self, term_id):
+        return bytes(self._blob[self._offsets[term_id] : self._offsets[term_id + 1]])
+
+    def lookup(self, term):
+        if isinstance(term, BlankNode):
+            return self._blank_ids.get(term)
+        encoded = _encode_term(term, None)
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._encoded(lo) == encoded:
+            return lo
+        return None
+
+    def intern(self, term):
+        raise TypeError("Mapped graphs are read-only")
+
+    def __getitem__(self, term_id):
+        encoded = self._encoded(term_id)
+        kind, payload = encoded[:1], encoded[1:]
+        if kind == b"u":
+            return NamedNode(payload.decode("utf-8"))
+        elif kind == b"l":
+            language, datatype, value = payload.split(b"\x00", 2)
+            return Literal(
+                value.decode("utf-8"),
+                language.decode("utf-8") or None,
+                NamedNode(datatype.decode("utf-8")) if datatype else None,
+            )
+        term = self._blanks.get(term_id)
+        if term is None:
+            term = self._blanks[term_id] = BlankNode()
+            self._blank_ids[term] = term_id
+        return term
+
+    def __contains__(self, term):
+        return self.lookup(term) is not None
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+
+class MappedGraph(CompactGraph):
+    """A read-only graph opened from a file written by
+    :py:func:`serialize_mapped`, with the same API as
+    :py:class:`~pymantic.primitives.CompactGraph`.
+
+    Opening the file only maps it in to memory, and reads nothing but its
+    header; terms and triples are read from the mapped pages as `match`
+    needs them. Call `close` to unmap the file."""
+
+    def __init__(self, path, graph_uri=None):
+        if not isinstance(graph_uri, NamedNode):
+            graph_uri = NamedNode(graph_uri)
+        self._uri = graph_uri
+        self._added = frozenset()
+        self._removed = frozenset()
+        self._observers = []
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = [memoryview(self._mmap)]
+        magic, byte_order, term_count, triple_count = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a mapped graph")
+        if byte_order != _BYTE_ORDER:
+            self.close()
+            raise ValueError(f"{path} was written with a different byte order")
+        position = _HEADER.size
+        offsets = self._view(position, term_count + 1)
+        position += len(offsets) * _ITEM
+        blob = self._views[0][position : position + offsets[-1]]
+        self._views.append(blob)
+        position += offsets[-1] + -offsets[-1] % _ITEM
+        self._terms = _MappedTerms(offsets, blob)
+        permutations = {}
+        for order in (self._SPO, self._POS, self._OSP):
+            columns = []
+            for _ in range(3):
+                columns.append(self._view(position, triple_count))
+                position += triple_count * _ITEM
+            permutations[order] = tuple(columns)
+        self._runs = [permutations]
+
+    def _view(self, position, length):
+        view = self._views[0][position : position + length * _ITEM].cast("q")
+        self._views.append(view)
+        return view
+
+    def close(self):
+        """Unmaps the file. The graph can't be used afterwards."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def _read_only(self, *args):
+        raise TypeError("Mapped graphs are read-only")
+
+    add = remove = addAll = removeMatches = transaction = _read_only
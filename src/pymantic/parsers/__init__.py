@@ -1,4 +1,5 @@
 __all__ = ["ntriples_parser", "nquads_parser", "turtle_parser", "jsonld_parser"]
 
 from .jsonld import jsonld_parser
-from .lark import nquads_parser, ntriples_parser, turtle_parser
+from .lark import turtle_parser
+from .ntriples import nquads_parser, ntriples_parser
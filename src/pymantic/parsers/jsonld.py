@@ -4,6 +4,7 @@ Usage::
 
   from pymantic.parsers.jsonld import jsonld_parser
   graph = jsonld_parser.parse_json(json.load(io.open('file.jsonld', mode='rt')))
+  quads = jsonld_parser.iter_quads(json.load(io.open('file.jsonld', mode='rt')))
 """
 
 import json
@@ -34,9 +35,7 @@ class PyLDLoader(BaseParser):
         return sink
 
     def make_quad(self, values):
-        quad = self.env.createQuad(*values)
-        self._call_state.graph.add(quad)
-        return quad
+        return self.env.createQuad(*values)
 
     def _make_graph(self):
         return self.env.createDataset()
@@ -60,7 +59,7 @@ class PyLDLoader(BaseParser):
                 language=language,
             )
 
-    def process_jobj(self, jobj, options=None):
+    def _quads(self, jobj, options=None):
         from pyld.jsonld import to_rdf
 
         dataset = to_rdf(jobj, options=options)
@@ -71,7 +70,7 @@ class PyLDLoader(BaseParser):
                 else None
             )
             for triple in triples:
-                self.make_quad(
+                yield self.make_quad(
                     (
                         self.process_triple_fragment(triple["subject"]),
                         self.process_triple_fragment(triple["predicate"]),
@@ -80,5 +79,18 @@ class PyLDLoader(BaseParser):
                     )
                 )
 
+    def process_jobj(self, jobj, options=None):
+        self._call_state.graph.addAll(self._quads(jobj, options))
+
+    def iter_quads(self, jobj, options=None):
+        """Yield the quads of a JSON-LD document, as loaded by `json.load`,
+        without adding them to a dataset."""
+        loader = type(self)(self.env)
+        loader._prepare_parse(None)
+        try:
+            yield from loader._quads(jobj, options)
+        finally:
+            loader._cleanup_parse()
+
 
 jsonld_parser = PyLDLoader()
@@ -1,3 +1,8 @@
+from collections import defaultdict
+
+from pymantic.compression import open_input
+
+
 class LarkParser:
     """Provide a consistent interface for parsing serialized RDF using one
     of the lark parsers.
@@ -23,18 +28,44 @@ class LarkParser:
 
             tf._prepare_parse(graph)
 
-            if hasattr(string_or_stream, "readline"):
-                triples = self.line_by_line_parser(string_or_stream)
-            else:
-                # Presume string.
-                triples = self.lark.parse(string_or_stream)
+            with open_input(string_or_stream) as stream:
+                if hasattr(stream, "readline"):
+                    triples = self.line_by_line_parser(stream)
+                else:
+                    # Presume string.
+                    triples = self.lark.parse(stream)
 
-            graph.addAll(triples)
+                graph.addAll(triples)
         finally:
             tf._cleanup_parse()
 
         return graph
 
+    def iter_triples(self, string_or_stream):
+        """Yield the triples (or quads) in a string, bytes, file-like object
+        or other iterable of lines as they are parsed, without adding them to
+        a graph. Bytes and binary streams may be compressed. Anything but a
+        string is read a line at a time."""
+        tf = self.lark.options.transformer
+        # The transformer is shared, so give it this call's blank nodes each
+        # time the generator resumes parsing.
+        bnodes = defaultdict(tf.env.createBlankNode)
+        with open_input(string_or_stream) as stream:
+            if isinstance(stream, str):
+                chunks = (stream,)
+            else:
+                chunks = (line for line in stream if line)
+            for chunk in chunks:
+                tf._prepare_parse(None)
+                tf._call_state.bnodes = bnodes
+                try:
+                    statements = list(self.lark.parse(chunk))
+                finally:
+                    tf._cleanup_parse()
+                yield from statements
+
+    iter_quads = iter_triples
+
     def parse_string(self, string_or_bytes, graph=None):
         """Parse a string, decoding it from bytes to UTF-8 if necessary."""
         if isinstance(string_or_bytes, bytes):
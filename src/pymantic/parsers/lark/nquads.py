@@ -22,7 +22,8 @@ class NQuadsTransformer(NTriplesTransformer):
     """Transform the tokenized nquads into RDF primitives."""
 
     def quad(self, children):
-        subject, predicate, object_, graph = children
+        # A quad without a graph is in the default graph.
+        subject, predicate, object_, graph = (children + [None])[:4]
         return self.make_quad(subject, predicate, object_, graph)
 
     def quads_start(self, children):
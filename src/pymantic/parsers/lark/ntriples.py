@@ -22,7 +22,7 @@ grammar = r"""triples_start: triple? (EOL triple)* EOL?
 triple: subject predicate object "."
 
 quads_start: quad? (EOL quad)* EOL?
-quad: subject predicate object graph "."
+quad: subject predicate object graph? "."
 
 ?subject: iriref
         | BLANK_NODE_LABEL -> blank_node_label
@@ -7,15 +7,23 @@ Usage::
   graph2 = turtle_parser.parse(\"\"\"@prefix p: <http://a.example/s>.
   p: <http://a.example/p> <http://a.example/o> .\"\"\")
 
-Unlike :mod:`pymantic.parsers.lark.ntriples`, this parser cannot efficiently
-parse turtle line by line. If a file-like object is provided, the entire file
-will be read into memory and parsed there.
+A file-like object is read ``chunk_size`` characters at a time and split
+after the last complete statement in what has been read so far, and only
+those statements are parsed, so memory use is bounded by the chunk size and
+the largest single statement rather than by the size of the file. Prefixes,
+the base IRI and blank node labels carry over from one chunk to the next.
+
+``turtle_parser.iter_triples()`` takes the same arguments as ``.parse()``,
+but yields the triples instead of adding them to a graph.
 """
 
+import codecs
+import io
 from lark import Lark, Transformer, Tree
 from lark.lexer import Token
 import re
 
+from pymantic.compression import open_input
 from pymantic.parsers.base import BaseParser
 from pymantic.primitives import BlankNode, Literal, NamedNode, Triple
 from pymantic.util import decode_literal, grouper, smart_urljoin
@@ -95,9 +103,6 @@ COMMENT: "#" /[^\n]/*
 %ignore COMMENT
 """
 
-turtle_lark = Lark(grammar, start="turtle_doc", parser="lalr")
-
-
 LEGAL_IRI = re.compile(r'^[^\x00-\x20<>"{}|^`\\]*$')
 
 
@@ -122,24 +127,36 @@ def unpack_predicate_object_list(subject, pol):
                 raise ValueError(predicate)
             predicate = RDF_TYPE
 
-        if not isinstance(object_, (NamedNode, Literal, BlankNode)):
-            if isinstance(object_, Tree):
-                object_ = object_.children
+        # An object list, or a single object.
+        objects = object_.children if isinstance(object_, Tree) else (object_,)
+        for object_ in objects:
+            if isinstance(object_, (NamedNode, Literal, BlankNode)):
+                yield Triple(subject, predicate, object_)
+                continue
+            # A collection or property list, which yields its triples and
+            # then its node.
             for triple_or_node in object_:
                 if isinstance(triple_or_node, Triple):
                     yield triple_or_node
                 else:
-                    object_ = triple_or_node
-                    yield Triple(subject, predicate, object_)
-        else:
-            yield Triple(subject, predicate, object_)
+                    yield Triple(subject, predicate, triple_or_node)
 
 
 class TurtleTransformer(BaseParser, Transformer):
-    def __init__(self, base_iri=""):
-        super().__init__()
-        self.base_iri = base_iri
-        self.prefixes = self.profile.prefixes
+    """Transform the tokenized turtle into RDF primitives as it is parsed.
+
+    The base IRI and prefixes a document declares are kept with the rest of
+    the per-parse state, so one transformer serves every parse."""
+
+    def _prepare_parse(self, graph, base_iri=""):
+        super()._prepare_parse(graph)
+        self._call_state.base_iri = base_iri
+        self._call_state.prefixes = dict(self.profile.prefixes)
+
+    def _cleanup_parse(self):
+        super()._cleanup_parse()
+        del self._call_state.base_iri
+        del self._call_state.prefixes
 
     def decode_iriref(self, iriref):
         return validate_iri(decode_literal(iriref[1:-1]))
@@ -149,7 +166,9 @@ class TurtleTransformer(BaseParser, Transformer):
 
         if iriref_or_pname.startswith("<"):
             return self.make_named_node(
-                smart_urljoin(self.base_iri, self.decode_iriref(iriref_or_pname))
+                smart_urljoin(
+                    self._call_state.base_iri, self.decode_iriref(iriref_or_pname)
+                )
             )
 
         return iriref_or_pname
@@ -170,13 +189,13 @@ class TurtleTransformer(BaseParser, Transformer):
     def prefixed_name(self, children):
         (pname,) = children
         ns, _, ln = pname.partition(":")
-        return self.make_named_node(self.prefixes[ns] + decode_literal(ln))
+        return self.make_named_node(self._call_state.prefixes[ns] + decode_literal(ln))
 
     def prefix_id(self, children):
         ns, iriref = children
-        iri = smart_urljoin(self.base_iri, self.decode_iriref(iriref))
+        iri = smart_urljoin(self._call_state.base_iri, self.decode_iriref(iriref))
         ns = ns[:-1]  # Drop trailing : from namespace
-        self.prefixes[ns] = iri
+        self._call_state.prefixes[ns] = iri
 
         return []
 
@@ -190,7 +209,9 @@ class TurtleTransformer(BaseParser, Transformer):
         if base_directive.startswith("@") and base_directive != "@base":
             raise ValueError("Unexpected @base: " + base_directive)
 
-        self.base_iri = smart_urljoin(self.base_iri, self.decode_iriref(base_iriref))
+        self._call_state.base_iri = smart_urljoin(
+            self._call_state.base_iri, self.decode_iriref(base_iriref)
+        )
 
         return []
 
@@ -282,26 +303,108 @@ class TurtleTransformer(BaseParser, Transformer):
                     yield triple
 
 
-def parse(string_or_stream, graph=None, base=""):
-    if hasattr(string_or_stream, "readline"):
-        string = string_or_stream.read()
-    else:
-        # Presume string.
-        string = string_or_stream
+turtle_lark = Lark(
+    grammar,
+    start="turtle_doc",
+    parser="lalr",
+    transformer=TurtleTransformer(),
+)
+
+
+# Splits turtle into tokens coarsely, just finely enough to find the full
+# stops that end statements: those outside strings, IRIs, comments and
+# brackets. Anything that might continue past the end of the text read so far
+# is matched by "partial", or by "unclosed" for a long string, which is tried
+# before short strings so that quotes inside it aren't taken for their ends.
+_SCAN = re.compile(
+    r"(?P<long>\x22{3}(?:\x22{0,2}(?:[^\x22\\]|\\.))*\x22{3}"
+    r"|'{3}(?:'{0,2}(?:[^'\\]|\\.))*'{3})"
+    r"|(?P<unclosed>\x22{3}|'{3})"
+    r"|(?P<short>\x22(?:[^\x22\\\n\r]|\\.)*\x22|'(?:[^'\\\n\r]|\\.)*')"
+    r"|(?P<iri><[^<>\n]*>)"
+    r"|(?P<comment>#[^\n]*\n)"
+    r"|(?P<partial>[\x22'<#])"
+    r"|(?P<open>[\[(])"
+    r"|(?P<close>[\])])"
+    r"|(?P<end>\.(?=[\s#]))"
+    r"|(?P<other>[^\x22'<#\[\]().\\]+|\\.|.)",
+    re.DOTALL,
+)
+
+
+def _statements(stream, chunk_size):
+    """Read stream chunk_size characters at a time, yielding the text up to
+    the end of the last complete statement read each time, and finally
+    whatever is left over."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = depth = cut = 0
+    eof = False
+    while not eof:
+        data = stream.read(chunk_size)
+        eof = not data
+        if isinstance(data, bytes):
+            data = decoder.decode(data, final=eof)
+        buffer += data
+        match = _SCAN.match
+        m = match(buffer, pos)
+        while m is not None:
+            kind = m.lastgroup
+            if not eof and (kind in ("partial", "unclosed") or m.end() == len(buffer)):
+                # Wait for the rest of this token.
+                break
+            if kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth -= 1
+            elif kind == "end" and depth == 0:
+                cut = m.end()
+            pos = m.end()
+            m = match(buffer, pos)
+        if cut:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+            pos -= cut
+            cut = 0
+    if buffer:
+        yield buffer
+
+
+def _stream(string_or_stream):
+    if isinstance(string_or_stream, str):
+        string_or_stream = io.StringIO(string_or_stream)
+    return string_or_stream
+
+
+def _triples(string_or_stream, graph, base, chunk_size):
+    tr = turtle_lark.options.transformer
+    # The transformer is shared, so give it this parse's state each time the
+    # generator resumes parsing, and take it back afterwards.
+    state = None
+    with open_input(_stream(string_or_stream)) as stream:
+        for statements in _statements(stream, chunk_size):
+            if state is None:
+                tr._prepare_parse(graph, base)
+            else:
+                vars(tr._call_state).update(state)
+            try:
+                triples = turtle_lark.parse(statements)
+            finally:
+                state = vars(tr._call_state).copy()
+                tr._cleanup_parse()
+            yield from triples
 
-    if isinstance(string_or_stream, bytes):
-        string = string_or_stream.decode("utf-8")
-    else:
-        string = string_or_stream
 
-    tree = turtle_lark.parse(string)
-    tr = TurtleTransformer(base_iri=base)
-    if graph is None:
-        graph = tr._make_graph()
-    tr._prepare_parse(graph)
+def iter_triples(string_or_stream, base="", chunk_size=1 << 16):
+    """Yield the triples of a turtle document as they are made, without adding
+    them to a graph."""
+    return _triples(string_or_stream, None, base, chunk_size)
 
-    graph.addAll(tr.transform(tree))
 
+def parse(string_or_stream, graph=None, base="", chunk_size=1 << 16):
+    if graph is None:
+        graph = turtle_lark.options.transformer._make_graph()
+    graph.addAll(_triples(string_or_stream, graph, base, chunk_size))
     return graph
 
 
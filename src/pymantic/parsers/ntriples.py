@@ -0,0 +1,300 @@
+"""Parse RDF serialized as ntriples or nquads files, quickly.
+
+Usage::
+
+  from pymantic.parsers import ntriples_parser, nquads_parser
+  graph = ntriples_parser.parse(io.open('a_file.nt', mode='rt'))
+  dataset = nquads_parser.parse(io.open('a_file.nq', mode='rt'), Dataset())
+
+Each line is recognized with a single precompiled regular expression rather
+than a full parse, which is many times faster than the Lark parsers in
+:py:mod:`pymantic.parsers.lark`, and makes the same primitives. Lines the
+expression doesn't recognize are handed to the Lark parser, which either
+parses them or raises its usual, detailed, syntax error.
+
+``iter_triples()`` (or ``iter_quads()``) yields the statements of a string or
+file as they are parsed, without building a graph::
+
+  for triple in ntriples_parser.iter_triples(io.open('a_file.nt', mode='rt')):
+      ...
+
+Large files can be split between several processes with ``parse_parallel``::
+
+  dataset = nquads_parser.parse_parallel('a_file.nq', Dataset(), workers=8)
+"""
+
+__all__ = ["NTriplesParser", "NQuadsParser", "ntriples_parser", "nquads_parser"]
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+import pathlib
+import re
+
+from pymantic.compression import open_input, sniff_compression
+from pymantic.util import decode_literal
+
+from .base import BaseParser
+from .lark import (
+    nquads_parser as lark_nquads_parser,
+    ntriples_parser as lark_ntriples_parser,
+)
+
+_IRIREF = r'<((?:[^\x00-\x20<>"{}|^`\\]|\\u[0-9A-Fa-f]{4}|\\U[0-9A-Fa-f]{8})*)>'
+
+_PN_CHARS_BASE = (
+    r"A-Za-z\u00C0-\u00D6\u00D8-\u00F6\u00F8-\u02FF\u0370-\u037D\u037F-\u1FFF"
+    r"\u200C-\u200D\u2070-\u218F\u2C00-\u2FEF\u3001-\uD7FF\uF900-\uFDCF"
+    r"\uFDF0-\uFFFD\U00010000-\U000EFFFF"
+)
+_PN_CHARS_U = _PN_CHARS_BASE + "_:"
+_PN_CHARS = _PN_CHARS_U + r"\-0-9\u00B7\u0300-\u036F\u203F-\u2040"
+
+_BLANK_NODE_LABEL = rf"(_:[{_PN_CHARS_U}0-9](?:[{_PN_CHARS}.]*[{_PN_CHARS}])?)"
+
+_LITERAL = (
+    r'"((?:[^"\\\n\r]|\\[tbnrf"\'\\]|\\u[0-9A-Fa-f]{4}|\\U[0-9A-Fa-f]{8})*)"'
+    rf"(?:\^\^{_IRIREF}|@([a-zA-Z]+(?:-[a-zA-Z0-9]+)*))?"
+)
+
+# Groups: subject IRI or label, predicate IRI, object IRI, label, literal
+# value, datatype or language.
+_TRIPLE = (
+    rf"[ \t]*(?:{_IRIREF}|{_BLANK_NODE_LABEL})"
+    rf"[ \t]*{_IRIREF}"
+    rf"[ \t]*(?:{_IRIREF}|{_BLANK_NODE_LABEL}|{_LITERAL})"
+)
+
+# Groups: graph IRI or label.
+_GRAPH = rf"[ \t]*(?:{_IRIREF}|{_BLANK_NODE_LABEL})"
+
+_END = r"[ \t]*\.[ \t\r]*(?:#.*)?$"
+
+_EMPTY_LINE = re.compile(r"[ \t\r]*(?:#.*)?$")
+
+
+def _unescape(string):
+    if "\\" in string:
+        return decode_literal(string)
+    return string
+
+
+class _BlankLabel(str):
+    """Stands in for a blank node in statements parsed in another process,
+    which are sent back to the parent process to be given `BlankNode`
+    objects."""
+
+
+class _BlankLabels(dict):
+    def __missing__(self, label):
+        return _BlankLabel(label)
+
+
+def _chunks(path, chunk_size):
+    """Split a file into ranges of about chunk_size bytes which start and end
+    on line boundaries, returning a list of (start, end) offsets."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(start + chunk_size)
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _parse_chunk(parser_class, path, start, end):
+    """Parse the lines of path between the offsets start and end, in a worker
+    process. Blank nodes are returned as `_BlankLabel`."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    parser = parser_class()
+    parser._prepare_parse(None)
+    parser._call_state.bnodes = _BlankLabels()
+    # Send each distinct term once; pickle writes repeats as references.
+    seen = {}
+
+    def dedupe(term):
+        return seen.setdefault((type(term), term), term)
+
+    try:
+        return [
+            statement._make(map(dedupe, statement))
+            for statement in parser._iter_lines(io.StringIO(data.decode("utf-8")))
+        ]
+    finally:
+        parser._cleanup_parse()
+
+
+class NTriplesParser(BaseParser):
+    """Parse ntriples a line at a time with a regular expression, falling back
+    to the Lark parser for lines it doesn't recognize. Provides the same
+    interface as :py:class:`pymantic.parsers.lark.base.LarkParser`."""
+
+    line_re = re.compile(_TRIPLE + _END)
+
+    fallback = lark_ntriples_parser
+
+    def _statement(self, groups):
+        """Make a statement from the groups of a match of `line_re`."""
+        return self.make_triple(*self._terms(groups))
+
+    def _terms(self, groups):
+        named_node = self.make_named_node
+        blank_node = self.make_blank_node
+        s_iri, s_label, p_iri, o_iri, o_label, value, datatype, lang = groups[:8]
+        if s_iri is not None:
+            subject = named_node(_unescape(s_iri))
+        else:
+            subject = blank_node(s_label)
+        predicate = named_node(_unescape(p_iri))
+        if o_iri is not None:
+            object_ = named_node(_unescape(o_iri))
+        elif o_label is not None:
+            object_ = blank_node(o_label)
+        elif datatype is not None:
+            object_ = self.make_datatype_literal(
+                _unescape(value), named_node(_unescape(datatype))
+            )
+        else:
+            object_ = self.make_language_literal(_unescape(value), lang)
+        return subject, predicate, object_
+
+    def _fallback(self, line):
+        """Parse line with the Lark parser, sharing this parse's blank
+        nodes."""
+        tf = self.fallback.lark.options.transformer
+        tf._call_state.bnodes = self._call_state.bnodes
+        tf._call_state.graph = self._call_state.graph
+        try:
+            return list(self.fallback.lark.parse(line))
+        finally:
+            tf._cleanup_parse()
+
+    def _iter_lines(self, lines):
+        """Yield the statements in an iterable of lines."""
+        match = self.line_re.match
+        statement = self._statement
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            m = match(line)
+            if m is not None:
+                yield statement(m.groups())
+            elif not _EMPTY_LINE.match(line):
+                yield from self._fallback(line)
+
+    def iter_triples(self, string_or_stream):
+        """Yield the statements in a string, bytes, file-like object or other
+        iterable of lines as each line is parsed, without adding them to a
+        graph. Lines are read one at a time, so memory use stays bounded
+        however large the input is."""
+        if isinstance(string_or_stream, str):
+            string_or_stream = io.StringIO(string_or_stream)
+        # A parser of its own keeps this call's blank nodes separate from any
+        # other parse in progress.
+        parser = type(self)(self.env)
+        parser._prepare_parse(None)
+        try:
+            with open_input(string_or_stream) as lines:
+                yield from parser._iter_lines(lines)
+        finally:
+            parser._cleanup_parse()
+
+    iter_quads = iter_triples
+
+    def parse(self, string_or_stream, graph=None):
+        """Parse a string or file-like object into RDF primitives and add
+        them to either the provided graph or a new graph.
+        """
+        if graph is None:
+            graph = self._make_graph()
+        self._prepare_parse(graph)
+        try:
+            with open_input(string_or_stream) as stream:
+                if not hasattr(stream, "readline"):
+                    # Presume string.
+                    stream = io.StringIO(stream)
+                graph.addAll(self._iter_lines(stream))
+        finally:
+            self._cleanup_parse()
+        return graph
+
+    def parse_string(self, string_or_bytes, graph=None):
+        """Parse a string, decoding it from bytes to UTF-8 if necessary."""
+        if isinstance(string_or_bytes, bytes):
+            string_or_bytes = string_or_bytes.decode("utf-8")
+        return self.parse(string_or_bytes, graph)
+
+    def parse_parallel(self, path, graph=None, workers=None, chunk_size=1 << 26):
+        """Parse the file at path in chunks of about chunk_size bytes, split on
+        line boundaries, in a pool of worker processes, adding the results to
+        either the provided graph or a new graph in file order.
+
+        Blank nodes are scoped to the whole file: a label used in several
+        chunks is the same `BlankNode` in all of them. At most two chunks
+        per worker are in flight at once, so memory use doesn't grow with
+        the size of the file.
+
+        A compressed file can't be split, and is parsed in this process."""
+        with open(path, "rb") as f:
+            if sniff_compression(f.read(6)) is not None:
+                return self.parse(pathlib.Path(path), graph)
+        if graph is None:
+            graph = self._make_graph()
+        self._prepare_parse(graph)
+        bnodes = self._call_state.bnodes
+
+        def resolve(statement):
+            if any(type(term) is _BlankLabel for term in statement):
+                return statement._make(
+                    bnodes[term] if type(term) is _BlankLabel else term
+                    for term in statement
+                )
+            return statement
+
+        workers = workers or os.cpu_count() or 1
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                pending = deque()
+                for start, end in _chunks(path, chunk_size):
+                    if len(pending) >= 2 * workers:
+                        graph.addAll(map(resolve, pending.popleft().result()))
+                    pending.append(
+                        executor.submit(_parse_chunk, type(self), path, start, end)
+                    )
+                while pending:
+                    graph.addAll(map(resolve, pending.popleft().result()))
+        finally:
+            self._cleanup_parse()
+        return graph
+
+
+class NQuadsParser(NTriplesParser):
+    """Parse nquads a line at a time with a regular expression, falling back
+    to the Lark parser for lines it doesn't recognize."""
+
+    line_re = re.compile(_TRIPLE + f"(?:{_GRAPH})?" + _END)
+
+    fallback = lark_nquads_parser
+
+    def _statement(self, groups):
+        subject, predicate, object_ = self._terms(groups)
+        g_iri, g_label = groups[8:]
+        if g_iri is not None:
+            graph = self.make_named_node(_unescape(g_iri))
+        elif g_label is not None:
+            graph = self.make_blank_node(g_label)
+        else:
+            # In the default graph.
+            graph = None
+        return self.make_quad(subject, predicate, object_, graph)
+
+
+ntriples_parser = NTriplesParser()
+nquads_parser = NQuadsParser()
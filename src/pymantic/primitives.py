@@ -7,7 +7,11 @@ __all__ = [
     "NamedNode",
     "Prefix",
     "BlankNode",
+    "TermDictionary",
+    "Transaction",
     "Graph",
+    "GraphSnapshot",
+    "CompactGraph",
     "Dataset",
     "PrefixMap",
     "TermMap",
@@ -18,14 +22,19 @@ __all__ = [
     "Profile",
 ]
 
+from array import array
+from bisect import bisect_left, bisect_right
 import collections
-from collections import defaultdict
 import datetime
+from functools import lru_cache
+import heapq
+from itertools import groupby, islice
 from operator import itemgetter
+import weakref
 
 from pymantic.serializers import nt_escape
 import pymantic.uri_schemes as uri_schemes
-from pymantic.util import quote_normalized_iri
+from pymantic.util import paused_gc, quote_normalized_iri
 
 
 def is_language(lang):
@@ -100,17 +109,22 @@ def to_curie(uri, namespaces, seperator=":", explicit=False):
 
     explicit - if True and the URI can be abbreviated, wrap the abbreviated
                form in []s to indicate that it is definitely a CURIE."""
-    matches = []
-    for prefix, namespace in namespaces.items():
-        if uri.startswith(namespace):
-            matches.append((prefix, namespace))
-    if len(matches) > 0:
-        prefix, namespace = sorted(matches, key=lambda pair: -len(pair[1]))[0]
-        if explicit:
-            return f"[{uri.replace(namespace, prefix + seperator)}]"
-        else:
-            return uri.replace(namespace, prefix + seperator)
-    return uri
+    if isinstance(namespaces, PrefixMap):
+        match = namespaces._longest_match(uri)
+    else:
+        # The first of the longest namespaces uri starts with.
+        match = max(
+            ((prefix, ns) for prefix, ns in namespaces.items() if uri.startswith(ns)),
+            key=lambda pair: len(pair[1]),
+            default=None,
+        )
+    if match is None:
+        return uri
+    prefix, namespace = match
+    curie = prefix + seperator + uri[len(namespace) :]
+    if explicit:
+        return f"[{curie}]"
+    return curie
 
 
 class Triple(tuple):
@@ -211,7 +225,11 @@ class Quad(tuple):
     graph = property(itemgetter(3))
 
     def __str__(self):
-        return f"{str(self.subject)} {str(self.predicate)} {str(self.object)} {str(self.graph)} .\n"
+        terms = f"{self.subject.toNT()} {self.predicate.toNT()} {self.object.toNT()}"
+        if self.graph is None:
+            # In the default graph.
+            return terms + " .\n"
+        return f"{terms} {self.graph.toNT()} .\n"
 
 
 def q_as_t(quad):
@@ -222,6 +240,33 @@ def t_as_q(graph_name, triple):
     return Quad(triple.subject, triple.predicate, triple.object, graph_name)
 
 
+# The ntriples forms of terms are cached, since the same terms (predicates
+# and classes above all) are serialized over and over. The caches hold the most
+# recently used terms, so a dump of mostly distinct terms can't fill memory,
+# and terms longer than _NT_CACHE_MAX_LENGTH, which are seldom repeated, are
+# never cached.
+_NT_CACHE_SIZE = 1 << 13
+_NT_CACHE_MAX_LENGTH = 256
+
+
+def _literal_nt(literal):
+    quoted = '"' + nt_escape(literal.value) + '"'
+    if literal.language:
+        return f"{quoted}@{literal.language}"
+    elif literal.datatype:
+        return f"{quoted}^^{literal.datatype.toNT()}"
+    else:
+        return quoted
+
+
+def _named_node_nt(named_node):
+    return f"<{nt_escape(quote_normalized_iri(named_node))}>"
+
+
+_cached_literal_nt = lru_cache(maxsize=_NT_CACHE_SIZE)(_literal_nt)
+_cached_named_node_nt = lru_cache(maxsize=_NT_CACHE_SIZE)(_named_node_nt)
+
+
 class Literal(tuple):
     """Literal(`value`, `language`, `datatype`)
 
@@ -289,13 +334,9 @@ class Literal(tuple):
         return str(self.value)
 
     def toNT(self):
-        quoted = '"' + nt_escape(self.value) + '"'
-        if self.language:
-            return f"{quoted}@{self.language}"
-        elif self.datatype:
-            return f"{quoted}^^{self.datatype.toNT()}"
-        else:
-            return quoted
+        if len(self[0]) > _NT_CACHE_MAX_LENGTH:
+            return _literal_nt(self)
+        return _cached_literal_nt(self)
 
 
 class NamedNode(str):
@@ -314,7 +355,9 @@ class NamedNode(str):
         return self.value
 
     def toNT(self):
-        return f"<{nt_escape(quote_normalized_iri(self.value))}>"
+        if len(self) > _NT_CACHE_MAX_LENGTH:
+            return _named_node_nt(self)
+        return _cached_named_node_nt(self)
 
 
 class Prefix(NamedNode):
@@ -353,49 +396,369 @@ class BlankNode:
         return str(self)
 
 
-def Index():
-    return defaultdict(Index)
+_BULK_BATCH = 10000
+
+
+def _batches(iterable, size=_BULK_BATCH):
+    """Split iterable in to lists of up to size items, so that a bulk load
+    pauses garbage collection only while inserting each list, and not while
+    the source, which may be a parser, is consumed."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _index_add(index, a, b, c, key):
+    """Store key at index[a][b][c], creating intermediate levels as needed."""
+    by_b = index.get(a)
+    if by_b is None:
+        index[a] = {b: {c: key}}
+        return
+    by_c = by_b.get(b)
+    if by_c is None:
+        by_b[b] = {c: key}
+    else:
+        by_c[c] = key
+
+
+def _index_remove(index, a, b, c):
+    """Delete index[a][b][c], pruning any levels left empty."""
+    by_b = index[a]
+    by_c = by_b[b]
+    del by_c[c]
+    if not by_c:
+        del by_b[b]
+        if not by_b:
+            del index[a]
+
+
+def _owned_child(parent, key, owned):
+    """Return parent[key], first replacing it with a copy if it is not in
+    owned (the nodes not shared with any snapshot, by id). owned holds the
+    nodes themselves as well as their ids, so an id can't be reused by a
+    different node while it is in owned."""
+    child = parent[key]
+    if id(child) not in owned:
+        child = parent[key] = dict(child)
+        owned[id(child)] = child
+    return child
+
+
+def _cow_index_add(index, a, b, c, key, owned):
+    """`_index_add` for an index whose nodes may be shared with snapshots:
+    shared nodes on the path are copied before being changed."""
+    by_b = index.get(a)
+    if by_b is None:
+        by_c = {c: key}
+        index[a] = by_b = {b: by_c}
+        owned[id(by_b)] = by_b
+        owned[id(by_c)] = by_c
+        return
+    by_b = _owned_child(index, a, owned)
+    if b not in by_b:
+        by_c = by_b[b] = {c: key}
+        owned[id(by_c)] = by_c
+    else:
+        _owned_child(by_b, b, owned)[c] = key
+
+
+def _cow_index_remove(index, a, b, c, owned):
+    """`_index_remove` for an index whose nodes may be shared with snapshots:
+    shared nodes on the path are copied before being changed, and nodes
+    dropped from the index are dropped from owned."""
+    by_b = index[a]
+    by_c = by_b[b]
+    if len(by_c) > 1:
+        del _owned_child(_owned_child(index, a, owned), b, owned)[c]
+    elif len(by_b) > 1:
+        del _owned_child(index, a, owned)[b]
+        owned.pop(id(by_c), None)
+    else:
+        del index[a]
+        owned.pop(id(by_b), None)
+        owned.pop(id(by_c), None)
+
+
+class TermDictionary:
+    """Interns RDF terms to small integer IDs, and decodes IDs back to terms.
+
+    A `Graph` given a `TermDictionary` stores tuples of IDs in its indexes
+    rather than the terms themselves, so each distinct term is held in memory
+    once no matter how many triples refer to it. A single dictionary may be
+    shared by several graphs, for example all the graphs of a `Dataset`. IDs
+    are never reclaimed, even once no triple refers to the term any more."""
+
+    def __init__(self):
+        self._ids = {}
+        self._terms = []
+
+    def intern(self, term):
+        """Return the ID for term, assigning a new one if necessary."""
+        try:
+            return self._ids[term]
+        except KeyError:
+            term_id = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+            return term_id
+
+    def lookup(self, term):
+        """Return the ID for term, or None if it has never been interned."""
+        return self._ids.get(term)
+
+    def __getitem__(self, term_id):
+        return self._terms[term_id]
+
+    def __contains__(self, term):
+        return term in self._ids
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __iter__(self):
+        return iter(self._terms)
+
+
+class Transaction:
+    """A batch of changes to a `Graph` or `Dataset`, made by
+    :py:meth:`Graph.transaction` or :py:meth:`Dataset.transaction`.
+
+    Additions and removals are buffered, and only applied to the graph when
+    the transaction is committed; used as a context manager, it commits when
+    the block finishes and rolls back if it raises. `added` and `removed`
+    hold the net change the transaction makes, and are kept after it is
+    committed, ready to be sent on elsewhere."""
+
+    def __init__(self, target):
+        self.target = target
+        self.added = set()
+        self.removed = set()
+        self._open = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def _check_open(self):
+        if not self._open:
+            raise ValueError("Transaction has already been committed or rolled back")
+
+    def add(self, item):
+        """Adds item to the transaction. This method returns the transaction
+        it was called on."""
+        self._check_open()
+        if item in self.removed:
+            self.removed.discard(item)
+        elif item not in self.target:
+            self.added.add(item)
+        return self
+
+    def remove(self, item):
+        """Removes item in the transaction, raising KeyError if it is in
+        neither the graph nor the transaction. This method returns the
+        transaction it was called on."""
+        self._check_open()
+        if item in self.added:
+            self.added.discard(item)
+        elif item in self.target and item not in self.removed:
+            self.removed.add(item)
+        else:
+            raise KeyError(item)
+        return self
+
+    def addAll(self, items):
+        for item in items:
+            self.add(item)
+        return self
+
+    def removeMatches(self, *pattern):
+        """Removes everything in the graph or the transaction which matches
+        the given arguments, as for the target's `match`."""
+        self._check_open()
+        for item in list(self.target.match(*pattern)):
+            if item not in self.removed:
+                self.removed.add(item)
+        for item in list(self.added):
+            if all(term is None or term == x for term, x in zip(pattern, item)):
+                self.added.discard(item)
+        return self
+
+    def __contains__(self, item):
+        return item in self.added or (item not in self.removed and item in self.target)
+
+    def commit(self):
+        """Applies the buffered changes to the graph.
+
+        If anything the transaction removes has since been removed from the
+        graph by other means, KeyError is raised before any change is made,
+        and the transaction is left open to be rolled back."""
+        self._check_open()
+        for item in self.removed:
+            if item not in self.target:
+                raise KeyError(item)
+        self._open = False
+        for item in self.removed:
+            self.target.remove(item)
+        self.target.addAll(self.added)
+
+    def rollback(self):
+        """Discards the buffered changes, leaving the graph untouched."""
+        self._check_open()
+        self._open = False
+        self.added.clear()
+        self.removed.clear()
 
 
 class Graph:
     """A `Graph` holds a set of one or more `Triple`. Implements the Python
-    set/sequence API for `in`, `for`, and `len`"""
+    set/sequence API for `in`, `for`, and `len`
+
+    If a `TermDictionary` is given, terms are interned to integer IDs and the
+    graph's indexes hold tuples of IDs, which are decoded back into `Triple`
+    on iteration and `match`.
+
+    :py:meth:`snapshot` returns a read-only view of the graph which shares
+    its indexes; after a snapshot the graph copies each index entry before
+    changing it, so the snapshot never sees later changes."""
 
-    def __init__(self, graph_uri=None):
+    def __init__(self, graph_uri=None, term_dictionary=None):
         if not isinstance(graph_uri, NamedNode):
             graph_uri = NamedNode(graph_uri)
         self._uri = graph_uri
+        self._terms = term_dictionary
         self._triples = set()
-        self._spo = Index()
-        self._pos = Index()
-        self._osp = Index()
+        self._spo = {}
+        self._pos = {}
+        self._osp = {}
+        self._predicate_counts = {}
         self._actions = set()
+        self._observers = []
+        # The index nodes this graph may change in place, by id, or None if
+        # no snapshot shares any of them; and the snapshots still in use.
+        self._owned = None
+        self._snapshots = None
 
     @property
     def uri(self):
         """URI name of the graph, if it has been given a name"""
         return self._uri
 
+    @property
+    def term_dictionary(self):
+        """The `TermDictionary` terms are interned in, or None."""
+        return self._terms
+
     def addAction(self, action):
         self._actions.add(action)
         return self
 
+    def _encode(self, triple):
+        """Intern the terms of triple, returning the key to store it under."""
+        if self._terms is None:
+            return triple
+        intern = self._terms.intern
+        return (intern(triple[0]), intern(triple[1]), intern(triple[2]))
+
+    def _lookup(self, triple):
+        """Return the key triple is stored under, or None if any of its terms
+        are unknown. Never interns new terms."""
+        if self._terms is None:
+            return triple
+        lookup = self._terms.lookup
+        key = (lookup(triple[0]), lookup(triple[1]), lookup(triple[2]))
+        if None in key:
+            return None
+        return key
+
+    def _decode(self, key):
+        terms = self._terms
+        return Triple(terms[key[0]], terms[key[1]], terms[key[2]])
+
+    def _writable(self):
+        """Prepare the graph for a change, copying the top-level structures
+        if they are shared with a snapshot. Returns the index nodes that may
+        be changed in place, by id, or None if there are no shared nodes at
+        all, as when every snapshot has been released."""
+        owned = self._owned
+        if owned is not None and not self._snapshots:
+            self._owned = self._snapshots = owned = None
+        if owned is not None and id(self._triples) not in owned:
+            self._triples = set(self._triples)
+            self._spo = dict(self._spo)
+            self._pos = dict(self._pos)
+            self._osp = dict(self._osp)
+            self._predicate_counts = dict(self._predicate_counts)
+            for node in (
+                self._triples,
+                self._spo,
+                self._pos,
+                self._osp,
+                self._predicate_counts,
+            ):
+                owned[id(node)] = node
+        return owned
+
+    def _notify_added(self, triples):
+        for observer in self._observers:
+            observer._graph_added(self, triples)
+
+    def _notify_removed(self, triples):
+        for observer in self._observers:
+            observer._graph_removed(self, triples)
+
     def add(self, triple):
         """Adds the specified Triple to the graph. This method returns the
         graph instance it was called on."""
-        self._triples.add(triple)
-        self._spo[triple.subject][triple.predicate][triple.object] = triple
-        self._pos[triple.predicate][triple.object][triple.subject] = triple
-        self._osp[triple.object][triple.subject][triple.predicate] = triple
+        key = self._encode(triple)
+        if key in self._triples:
+            return self
+        s, p, o = key[0], key[1], key[2]
+        owned = self._writable()
+        self._triples.add(key)
+        if owned is None:
+            _index_add(self._spo, s, p, o, key)
+            _index_add(self._pos, p, o, s, key)
+            _index_add(self._osp, o, s, p, key)
+        else:
+            _cow_index_add(self._spo, s, p, o, key, owned)
+            _cow_index_add(self._pos, p, o, s, key, owned)
+            _cow_index_add(self._osp, o, s, p, key, owned)
+        self._predicate_counts[p] = self._predicate_counts.get(p, 0) + 1
+        if self._observers:
+            self._notify_added((triple,))
         return self
 
     def remove(self, triple):
         """Removes the specified Triple from the graph. This method returns the
         graph instance it was called on."""
-        self._triples.remove(triple)
-        del self._spo[triple.subject][triple.predicate][triple.object]
-        del self._pos[triple.predicate][triple.object][triple.subject]
-        del self._osp[triple.object][triple.subject][triple.predicate]
+        key = self._lookup(triple)
+        if key is None or key not in self._triples:
+            raise KeyError(triple)
+        s, p, o = key[0], key[1], key[2]
+        owned = self._writable()
+        self._triples.remove(key)
+        if owned is None:
+            _index_remove(self._spo, s, p, o)
+            _index_remove(self._pos, p, o, s)
+            _index_remove(self._osp, o, s, p)
+        else:
+            _cow_index_remove(self._spo, s, p, o, owned)
+            _cow_index_remove(self._pos, p, o, s, owned)
+            _cow_index_remove(self._osp, o, s, p, owned)
+        if self._predicate_counts[p] == 1:
+            del self._predicate_counts[p]
+        else:
+            self._predicate_counts[p] -= 1
+        if self._observers:
+            self._notify_removed((triple,))
         return self
 
     def match(self, subject=None, predicate=None, object=None):
@@ -416,17 +779,30 @@ class Graph:
         This method implements AND functionality, so only triples matching all
         of the given non-null arguments will be included in the result.
         """
-        if subject:
-            if predicate:  # s, p, ???
-                if object:  # s, p, o
-                    if Triple(subject, predicate, object) in self:
-                        yield Triple(subject, predicate, object)
+        if self._terms is None:
+            return self._match(subject, predicate, object)
+        pattern = []
+        for term in (subject, predicate, object):
+            if term is not None:
+                term = self._terms.lookup(term)
+                if term is None:
+                    return iter(())
+            pattern.append(term)
+        return map(self._decode, self._match(*pattern))
+
+    def _match(self, subject, predicate, object):
+        """Yield the stored keys matching a pattern of (encoded) terms."""
+        if subject is not None:
+            if predicate is not None:  # s, p, ???
+                if object is not None:  # s, p, o
+                    if (subject, predicate, object) in self._triples:
+                        yield self._spo[subject][predicate][object]
                 else:  # s, p, ?var
                     if subject in self._spo and predicate in self._spo[subject]:
                         for triple in self._spo[subject][predicate].values():
                             yield triple
             else:  # s, ?var, ???
-                if object:  # s, ?var, o
+                if object is not None:  # s, ?var, o
                     if object in self._osp and subject in self._osp[object]:
                         for triple in self._osp[object][subject].values():
                             yield triple
@@ -435,8 +811,8 @@ class Graph:
                         for predicate in self._spo[subject]:
                             for triple in self._spo[subject][predicate].values():
                                 yield triple
-        elif predicate:  # ?var, p, ???
-            if object:  # ?var, p, o
+        elif predicate is not None:  # ?var, p, ???
+            if object is not None:  # ?var, p, o
                 if predicate in self._pos and object in self._pos[predicate]:
                     for triple in self._pos[predicate][object].values():
                         yield triple
@@ -445,7 +821,7 @@ class Graph:
                     for object in self._pos[predicate]:
                         for triple in self._pos[predicate][object].values():
                             yield triple
-        elif object:  # ?var, ?var, o
+        elif object is not None:  # ?var, ?var, o
             if object in self._osp:
                 for subject in self._osp[object]:
                     for triple in self._osp[object][subject].values():
@@ -454,20 +830,146 @@ class Graph:
             for triple in self._triples:
                 yield triple
 
+    def count(self, subject=None, predicate=None, object=None):
+        """Returns the number of triples :py:meth:`match` would return for the
+        same arguments, without materializing them. Answered from the sizes of
+        the indexes: in constant time when no term or at least two terms are
+        given, for a predicate alone from a running count, and otherwise in
+        time proportional to the number of distinct predicates of the subject
+        or subjects of the object."""
+        pattern = [subject, predicate, object]
+        if self._terms is not None:
+            for i, term in enumerate(pattern):
+                if term is not None:
+                    pattern[i] = self._terms.lookup(term)
+                    if pattern[i] is None:
+                        return 0
+        subject, predicate, object = pattern
+        if subject is not None:
+            if predicate is not None:
+                if object is not None:
+                    return int((subject, predicate, object) in self._triples)
+                if subject in self._spo and predicate in self._spo[subject]:
+                    return len(self._spo[subject][predicate])
+            elif object is not None:
+                if object in self._osp and subject in self._osp[object]:
+                    return len(self._osp[object][subject])
+            elif subject in self._spo:
+                return sum(map(len, self._spo[subject].values()))
+            return 0
+        elif predicate is not None:
+            if object is not None:
+                if predicate in self._pos and object in self._pos[predicate]:
+                    return len(self._pos[predicate][object])
+                return 0
+            return self._predicate_counts.get(predicate, 0)
+        elif object is not None:
+            if object in self._osp:
+                return sum(map(len, self._osp[object].values()))
+            return 0
+        return len(self._triples)
+
+    def predicate_counts(self):
+        """Returns a dictionary of the number of triples using each predicate
+        in the graph. The counts are maintained as triples are added and
+        removed, so this is cheap to poll."""
+        return dict(
+            zip(
+                self._decode_keys(self._predicate_counts.keys()),
+                self._predicate_counts.values(),
+            )
+        )
+
     def removeMatches(self, subject, predicate, object):
         """This method removes those triples in the current graph which match
         the given arguments."""
-        for triple in self.match(subject, predicate, object):
+        for triple in list(self.match(subject, predicate, object)):
             self.remove(triple)
         return self
 
     def addAll(self, graph_or_triples):
         """Imports the graph or set of triples in to this graph. This method
-        returns the graph instance it was called on."""
-        for triple in graph_or_triples:
-            self.add(triple)
+        returns the graph instance it was called on.
+
+        This is the bulk-load path used by the parsers: triples already in the
+        graph are skipped before touching the indexes, the indexes are filled
+        without a method call per triple, and garbage collection is paused
+        while each batch of triples is inserted."""
+        owned = self._writable()
+        triples = self._triples
+        spo, pos, osp = self._spo, self._pos, self._osp
+        predicate_counts = self._predicate_counts
+        added = [] if self._observers else None
+        if self._terms is None:
+            keys = graph_or_triples
+        else:
+            keys = map(self._encode, graph_or_triples)
+        try:
+            for batch in _batches(keys):
+                with paused_gc():
+                    for key in batch:
+                        if key in triples:
+                            continue
+                        triples.add(key)
+                        s, p, o = key[0], key[1], key[2]
+                        if owned is None:
+                            _index_add(spo, s, p, o, key)
+                            _index_add(pos, p, o, s, key)
+                            _index_add(osp, o, s, p, key)
+                        else:
+                            _cow_index_add(spo, s, p, o, key, owned)
+                            _cow_index_add(pos, p, o, s, key, owned)
+                            _cow_index_add(osp, o, s, p, key, owned)
+                        predicate_counts[p] = predicate_counts.get(p, 0) + 1
+                        if added is not None:
+                            added.append(key)
+        finally:
+            # Notify of the triples added even if the source fails part way.
+            if added:
+                if self._terms is not None:
+                    added = list(map(self._decode, added))
+                self._notify_added(added)
         return self
 
+    def transaction(self):
+        """Returns a :py:class:`Transaction` which buffers changes to this
+        graph and applies them together::
+
+            with graph.transaction() as tx:
+                tx.remove(old)
+                tx.add(new)
+            push(tx.removed, tx.added)
+        """
+        return Transaction(self)
+
+    def snapshot(self):
+        """Returns a read-only :py:class:`GraphSnapshot` of the graph as it is
+        now, in constant time. The snapshot shares the graph's indexes, so it
+        can be iterated and matched against from other threads while this
+        graph goes on changing, without any locking.
+
+        The first change after a snapshot copies the graph's set of triples
+        and the top level of each index; later changes copy only the index
+        entries they touch, once each. Once every snapshot has been released,
+        changes are made in place again. Snapshots should be taken by the
+        thread making the changes."""
+        snapshot = GraphSnapshot.__new__(GraphSnapshot)
+        snapshot._uri = self._uri
+        snapshot._terms = self._terms
+        snapshot._triples = self._triples
+        snapshot._spo = self._spo
+        snapshot._pos = self._pos
+        snapshot._osp = self._osp
+        snapshot._predicate_counts = self._predicate_counts
+        snapshot._actions = frozenset()
+        snapshot._observers = ()
+        snapshot._owned = snapshot._snapshots = None
+        self._owned = {}
+        if self._snapshots is None:
+            self._snapshots = weakref.WeakSet()
+        self._snapshots.add(snapshot)
+        return snapshot
+
     def merge(self, graph):
         """Returns a new Graph which is a concatenation of this graph and the
         graph given as an argument."""
@@ -479,83 +981,683 @@ class Graph:
         return new_graph
 
     def __contains__(self, item):
-        return item in self._triples
+        key = self._lookup(item)
+        return key is not None and key in self._triples
 
     def __len__(self):
         return len(self._triples)
 
     def __iter__(self):
-        return iter(self._triples)
+        if self._terms is None:
+            return iter(self._triples)
+        return map(self._decode, self._triples)
 
     def toArray(self):
         """Return the set of :py:class:`Triple` within the :py:class:`Graph`"""
-        return frozenset(self._triples)
+        return frozenset(self)
+
+    def _decode_keys(self, keys):
+        if self._terms is None:
+            return keys
+        return map(self._terms.__getitem__, keys)
 
     def subjects(self):
         """Returns an iterator over subjects in the graph."""
-        return self._spo.keys()
+        return self._decode_keys(self._spo.keys())
 
     def predicates(self):
         """Returns an iterator over predicates in the graph."""
-        return self._pos.keys()
+        return self._decode_keys(self._pos.keys())
 
     def objects(self):
         """Returns an iterator over objects in the graph."""
-        return self._osp.keys()
+        return self._decode_keys(self._osp.keys())
+
+
+class GraphSnapshot(Graph):
+    """A read-only view of a :py:class:`Graph` at the moment
+    :py:meth:`Graph.snapshot` was called. Supports everything a `Graph` does
+    except changing it."""
+
+    def _read_only(self, *args):
+        raise TypeError("Graph snapshots are read-only")
+
+    add = remove = addAll = removeMatches = addAction = transaction = _read_only
+
+    def snapshot(self):
+        return self
+
+
+class CompactGraph:
+    """A `CompactGraph` holds a set of `Triple` with the same API as `Graph`,
+    for large, read-mostly graphs that are loaded once and queried often.
+
+    Terms are interned in a `TermDictionary`, and the triples are kept as
+    three sorted permutations of their IDs (SPO, POS and OSP), each stored
+    as three `array` columns, so a triple costs a few dozen bytes rather
+    than the hundreds a `Graph` spends on nested dictionaries. Lookups are
+    binary searches over the columns.
+
+    Additions and removals are held in a small write buffer which `match`
+    consults alongside the arrays, and are merged into the arrays once
+    `buffer_size` changes are pending, or when `flush` is called. Additions
+    are written as a new sorted run of arrays, and runs are merged when a
+    newer one grows to half the size of an older one, so that each triple is
+    copied a logarithmic number of times however large the graph grows."""
+
+    # For each permutation, the column holding the subject, predicate and
+    # object respectively.
+    _SPO = (0, 1, 2)
+    _POS = (2, 0, 1)
+    _OSP = (1, 2, 0)
+
+    def __init__(self, graph_uri=None, term_dictionary=None, buffer_size=10000):
+        if not isinstance(graph_uri, NamedNode):
+            graph_uri = NamedNode(graph_uri)
+        self._uri = graph_uri
+        if term_dictionary is None:
+            term_dictionary = TermDictionary()
+        self._terms = term_dictionary
+        self.buffer_size = buffer_size
+        # Each run maps each permutation to its columns.
+        self._runs = []
+        self._added = set()
+        self._removed = set()
+        self._observers = []
+
+    @property
+    def uri(self):
+        """URI name of the graph, if it has been given a name"""
+        return self._uri
+
+    @property
+    def term_dictionary(self):
+        """The `TermDictionary` terms are interned in."""
+        return self._terms
+
+    @staticmethod
+    def _range(columns, prefix):
+        """Find the rows of a permutation whose leading columns equal prefix."""
+        lo, hi = 0, len(columns[0])
+        for column, value in zip(columns, prefix):
+            lo = bisect_left(column, value, lo, hi)
+            hi = bisect_right(column, value, lo, hi)
+        return lo, hi
+
+    @classmethod
+    def _run_holds(cls, run, key):
+        lo, hi = cls._range(run[cls._SPO], key)
+        return lo < hi
+
+    def _stored(self, key):
+        """Is key (an ID triple) present in the arrays?"""
+        return any(self._run_holds(run, key) for run in self._runs)
+
+    @classmethod
+    def _merged(cls, runs, removed=()):
+        """Merge runs in to one, leaving out the keys in removed."""
+        merged = {}
+        for order in (cls._SPO, cls._POS, cls._OSP):
+            rows = heapq.merge(*(zip(*run[order]) for run in runs))
+            columns = (array("q"), array("q"), array("q"))
+            append0, append1, append2 = (column.append for column in columns)
+            for row in rows:
+                if removed and (row[order[0]], row[order[1]], row[order[2]]) in removed:
+                    continue
+                append0(row[0])
+                append1(row[1])
+                append2(row[2])
+            merged[order] = columns
+        return merged
+
+    @classmethod
+    def _sorted_run(cls, keys):
+        """Make a run of the ID triples keys."""
+        run = {}
+        for order in (cls._SPO, cls._POS, cls._OSP):
+            inverse = sorted(range(3), key=order.__getitem__)
+            rows = sorted(
+                (key[inverse[0]], key[inverse[1]], key[inverse[2]]) for key in keys
+            )
+            run[order] = tuple(array("q", map(itemgetter(i), rows)) for i in range(3))
+        return run
+
+    @staticmethod
+    def _run_size(run):
+        return len(next(iter(run.values()))[0])
+
+    def _lookup(self, triple):
+        lookup = self._terms.lookup
+        key = (lookup(triple[0]), lookup(triple[1]), lookup(triple[2]))
+        if None in key:
+            return None
+        return key
+
+    def _decode(self, key):
+        terms = self._terms
+        return Triple(terms[key[0]], terms[key[1]], terms[key[2]])
+
+    _notify_added = Graph._notify_added
+    _notify_removed = Graph._notify_removed
+    transaction = Graph.transaction
+
+    def add(self, triple):
+        """Adds the specified Triple to the graph. This method returns the
+        graph instance it was called on."""
+        intern = self._terms.intern
+        key = (intern(triple[0]), intern(triple[1]), intern(triple[2]))
+        if key in self._removed:
+            self._removed.discard(key)
+        elif key not in self._added and not self._stored(key):
+            self._added.add(key)
+            if len(self._added) + len(self._removed) >= self.buffer_size:
+                self.flush()
+        else:
+            return self
+        if self._observers:
+            self._notify_added((triple,))
+        return self
+
+    def remove(self, triple):
+        """Removes the specified Triple from the graph. This method returns the
+        graph instance it was called on."""
+        key = self._lookup(triple)
+        if key is not None and key in self._added:
+            self._added.discard(key)
+        elif key is not None and key not in self._removed and self._stored(key):
+            self._removed.add(key)
+            if len(self._added) + len(self._removed) >= self.buffer_size:
+                self.flush()
+        else:
+            raise KeyError(triple)
+        if self._observers:
+            self._notify_removed((triple,))
+        return self
+
+    def addAll(self, graph_or_triples):
+        """Imports the graph or set of triples in to this graph, merging them
+        in to the arrays a buffer at a time. This method returns the graph
+        instance it was called on."""
+        intern = self._terms.intern
+        added = self._added
+        removed = self._removed
+        new = [] if self._observers else None
+        try:
+            for batch in _batches(graph_or_triples):
+                with paused_gc():
+                    for triple in batch:
+                        key = (intern(triple[0]), intern(triple[1]), intern(triple[2]))
+                        if key in removed:
+                            removed.discard(key)
+                        elif key not in added and not self._stored(key):
+                            added.add(key)
+                            if len(added) + len(removed) >= self.buffer_size:
+                                # Merge in batches, so the buffer stays bounded.
+                                self.flush()
+                                added = self._added
+                                removed = self._removed
+                        else:
+                            continue
+                        if new is not None:
+                            new.append(triple)
+        finally:
+            if new:
+                self._notify_added(new)
+        return self
+
+    def flush(self):
+        """Merge any buffered additions and removals in to the arrays. This
+        method returns the graph instance it was called on.
+
+        Only the runs holding removed triples are rewritten, and additions
+        only merge with runs no more than twice their size, so the cost of a
+        flush is proportional to the buffer rather than the graph, amortized
+        over the life of the graph."""
+        runs = self._runs
+        if self._removed:
+            removed = self._removed
+            runs = [
+                self._merged([run], removed)
+                if any(self._run_holds(run, key) for key in removed)
+                else run
+                for run in runs
+            ]
+        if self._added:
+            runs.append(self._sorted_run(self._added))
+        runs = [run for run in runs if self._run_size(run)]
+        while len(runs) > 1 and self._run_size(runs[-2]) <= 2 * self._run_size(
+            runs[-1]
+        ):
+            runs[-2:] = [self._merged(runs[-2:])]
+        self._runs = runs
+        self._added = set()
+        self._removed = set()
+        return self
+
+    def _compact(self):
+        """Flush, and merge the runs in to one."""
+        self.flush()
+        if len(self._runs) > 1:
+            self._runs = [self._merged(self._runs)]
+        if not self._runs:
+            return {order: ((), (), ()) for order in (self._SPO, self._POS, self._OSP)}
+        return self._runs[0]
+
+    def match(self, subject=None, predicate=None, object=None):
+        """Returns the triples in the graph matching the given subject,
+        predicate and object; arguments that are None match anything. See
+        :py:meth:`Graph.match`."""
+        pattern = []
+        for term in (subject, predicate, object):
+            if term is not None:
+                term = self._terms.lookup(term)
+                if term is None:
+                    return iter(())
+            pattern.append(term)
+        return map(self._decode, self._match(*pattern))
+
+    def _plan(self, subject, predicate, object):
+        """Choose the permutation to answer a pattern of IDs from, and the
+        prefix of its columns to search for."""
+        if subject is not None:
+            if object is not None and predicate is None:
+                order, prefix = self._OSP, (object, subject)
+            else:
+                order, prefix = self._SPO, (subject, predicate, object)
+        elif predicate is not None:
+            order, prefix = self._POS, (predicate, object)
+        elif object is not None:
+            order, prefix = self._OSP, (object,)
+        else:
+            order, prefix = self._SPO, ()
+        return order, tuple(value for value in prefix if value is not None)
+
+    def _match(self, subject, predicate, object):
+        """Yield the ID triples matching a pattern of IDs."""
+        order, prefix = self._plan(subject, predicate, object)
+        removed = self._removed
+        for run in list(self._runs):
+            columns = run[order]
+            lo, hi = self._range(columns, prefix)
+            s_column, p_column, o_column = (columns[i] for i in order)
+            for i in range(lo, hi):
+                key = (s_column[i], p_column[i], o_column[i])
+                if key not in removed:
+                    yield key
+        for key in list(self._added):
+            if (
+                (subject is None or key[0] == subject)
+                and (predicate is None or key[1] == predicate)
+                and (object is None or key[2] == object)
+            ):
+                yield key
+
+    def count(self, subject=None, predicate=None, object=None):
+        """Returns the number of triples :py:meth:`match` would return for the
+        same arguments, without materializing them. Costs a binary search plus
+        a scan of the write buffer."""
+        pattern = []
+        for term in (subject, predicate, object):
+            if term is not None:
+                term = self._terms.lookup(term)
+                if term is None:
+                    return 0
+            pattern.append(term)
+        order, prefix = self._plan(*pattern)
+        total = 0
+        for run in self._runs:
+            lo, hi = self._range(run[order], prefix)
+            total += hi - lo
+        for changes, sign in ((self._removed, -1), (self._added, 1)):
+            for key in changes:
+                if all(term is None or term == k for term, k in zip(pattern, key)):
+                    total += sign
+        return total
+
+    def predicate_counts(self):
+        """Returns a dictionary of the number of triples using each predicate
+        in the graph. Merges any buffered changes first."""
+        column = self._compact()[self._POS][0]
+        counts = {}
+        for term_id, run in groupby(column):
+            counts[self._terms[term_id]] = sum(1 for _ in run)
+        return counts
+
+    def removeMatches(self, subject, predicate, object):
+        """This method removes those triples in the current graph which match
+        the given arguments."""
+        for triple in list(self.match(subject, predicate, object)):
+            self.remove(triple)
+        return self
+
+    def __contains__(self, item):
+        key = self._lookup(item)
+        if key is None:
+            return False
+        return key in self._added or (key not in self._removed and self._stored(key))
+
+    def __len__(self):
+        return (
+            sum(map(self._run_size, self._runs)) - len(self._removed) + len(self._added)
+        )
+
+    def __iter__(self):
+        return self.match()
+
+    def toArray(self):
+        """Return the set of :py:class:`Triple` within the graph"""
+        return frozenset(self)
+
+    def _distinct(self, order):
+        column = self._compact()[order][0]
+        return (self._terms[term_id] for term_id, _ in groupby(column))
+
+    def subjects(self):
+        """Returns an iterator over subjects in the graph. Merges any buffered
+        changes first."""
+        return self._distinct(self._SPO)
+
+    def predicates(self):
+        """Returns an iterator over predicates in the graph. Merges any buffered
+        changes first."""
+        return self._distinct(self._POS)
+
+    def objects(self):
+        """Returns an iterator over objects in the graph. Merges any buffered
+        changes first."""
+        return self._distinct(self._OSP)
+
+
+def _quad_index_add(index, a, b, c, graph_name):
+    """Add graph_name to the tuple of graphs at index[a][b][c]."""
+    by_b = index.get(a)
+    if by_b is None:
+        index[a] = {b: {c: (graph_name,)}}
+        return
+    by_c = by_b.get(b)
+    if by_c is None:
+        by_b[b] = {c: (graph_name,)}
+        return
+    by_c[c] = by_c.get(c, ()) + (graph_name,)
+
+
+def _quad_index_remove(index, a, b, c, graph_name):
+    """Remove graph_name from index[a][b][c], pruning empty entries."""
+    by_b = index[a]
+    by_c = by_b[b]
+    graphs = tuple(g for g in by_c[c] if g != graph_name)
+    if graphs:
+        by_c[c] = graphs
+        return
+    del by_c[c]
+    if not by_c:
+        del by_b[b]
+        if not by_b:
+            del index[a]
 
 
 class Dataset:
-    def __init__(self):
-        self._graphs = defaultdict(Graph)
+    """A `Dataset` holds a set of named `Graph`, and implements the Python
+    set/sequence API for `in`, `for`, and `len` over their `Quad`.
+
+    As well as the graphs themselves (which act as a GSPO index), the dataset
+    keeps SPOG, POSG and OSPG indexes across all of its graphs, so patterns
+    that don't name a graph are answered without visiting every graph. The
+    indexes are kept up to date even if a graph in the dataset is changed
+    directly.
+
+    If a `TermDictionary` is given, it is shared by all of the graphs in the
+    dataset, and the cross-graph indexes store its IDs rather than the terms
+    themselves."""
+
+    def __init__(self, term_dictionary=None):
+        self._terms = term_dictionary
+        self._graphs = {}
+        self._spog = {}
+        self._posg = {}
+        self._ospg = {}
+        self._predicate_counts = {}
+        self._size = 0
+
+    def _graph(self, graph_name):
+        """Get the named graph, creating it if necessary."""
+        graph = self._graphs.get(graph_name)
+        if graph is None:
+            graph = Graph(term_dictionary=self._terms)
+            graph._uri = graph_name
+            self._attach(graph)
+        return graph
+
+    def _attach(self, graph):
+        self._graphs[graph.uri] = graph
+        graph._observers.append(self)
+        self._graph_added(graph, graph)
+
+    def _detach(self, graph):
+        del self._graphs[graph.uri]
+        graph._observers.remove(self)
+        self._graph_removed(graph, graph)
+
+    def _encode(self, triples, intern):
+        """Yield (s, p, o) keys for the cross-graph indexes of triples, as IDs
+        from intern if the dataset has a term dictionary."""
+        if self._terms is None:
+            for triple in triples:
+                yield triple[0], triple[1], triple[2]
+        else:
+            for triple in triples:
+                yield intern(triple[0]), intern(triple[1]), intern(triple[2])
+
+    def _pattern(self, subject, predicate, object):
+        """Encode the terms of a pattern to keys of the cross-graph indexes.
+        Returns None if a term can't be in the dataset at all."""
+        if self._terms is None:
+            return subject, predicate, object
+        pattern = []
+        for term in (subject, predicate, object):
+            if term is not None:
+                term = self._terms.lookup(term)
+                if term is None:
+                    return None
+            pattern.append(term)
+        return pattern
+
+    def _decode(self, quad):
+        terms = self._terms
+        return Quad(terms[quad[0]], terms[quad[1]], terms[quad[2]], quad[3])
+
+    def _decode_keys(self, keys):
+        if self._terms is None:
+            return keys
+        return map(self._terms.__getitem__, keys)
+
+    def _graph_added(self, graph, triples):
+        name = graph.uri
+        intern = self._terms.intern if self._terms is not None else None
+        for s, p, o in self._encode(triples, intern):
+            _quad_index_add(self._spog, s, p, o, name)
+            _quad_index_add(self._posg, p, o, s, name)
+            _quad_index_add(self._ospg, o, s, p, name)
+            self._predicate_counts[p] = self._predicate_counts.get(p, 0) + 1
+            self._size += 1
+
+    def _graph_removed(self, graph, triples):
+        name = graph.uri
+        intern = self._terms.lookup if self._terms is not None else None
+        for s, p, o in self._encode(triples, intern):
+            _quad_index_remove(self._spog, s, p, o, name)
+            _quad_index_remove(self._posg, p, o, s, name)
+            _quad_index_remove(self._ospg, o, s, p, name)
+            if self._predicate_counts[p] == 1:
+                del self._predicate_counts[p]
+            else:
+                self._predicate_counts[p] -= 1
+            self._size -= 1
 
     def add(self, quad):
-        self._graphs[quad.graph]._uri = quad.graph
-        self._graphs[quad.graph].add(q_as_t(quad))
+        self._graph(quad.graph).add(q_as_t(quad))
 
     def remove(self, quad):
-        self._graphs[quad.graph].remove(q_as_t(quad))
+        graph = self._graphs.get(quad.graph)
+        if graph is None:
+            raise KeyError(quad)
+        graph.remove(q_as_t(quad))
 
     def add_graph(self, graph, named=None):
         name = named or graph.uri
         if name:
+            if name in self._graphs:
+                self._detach(self._graphs[name])
             graph._uri = name
-            self._graphs[graph.uri] = graph
+            self._attach(graph)
         else:
             raise ValueError("Graph must be named")
 
     def remove_graph(self, graph_or_uri):
-        pass
+        """Removes a graph, given either the graph or its name, from the
+        dataset."""
+        name = getattr(graph_or_uri, "uri", graph_or_uri)
+        if name in self._graphs:
+            self._detach(self._graphs[name])
 
     @property
     def graphs(self):
         return self._graphs.values()
 
+    def subjects(self):
+        """Returns an iterator over subjects in any graph in the dataset."""
+        return self._decode_keys(self._spog.keys())
+
     def match(self, subject=None, predicate=None, object=None, graph=None):
         if graph:
-            matches = self._graphs[graph].match(subject, predicate, object)
-            for match in matches:
-                yield t_as_q(graph, match)
+            if graph in self._graphs:
+                for match in self._graphs[graph].match(subject, predicate, object):
+                    yield t_as_q(graph, match)
+        elif subject is None and predicate is None and object is None:
+            yield from self
+        elif self._terms is None:
+            yield from self._match(subject, predicate, object)
         else:
-            for graph_uri, graph in self._graphs.items():
-                for match in graph.match(subject, predicate, object):
-                    yield t_as_q(graph_uri, match)
+            pattern = self._pattern(subject, predicate, object)
+            if pattern is not None:
+                yield from map(self._decode, self._match(*pattern))
+
+    def _match(self, subject, predicate, object):
+        """Yield quads of the stored keys matching a pattern of (encoded)
+        terms, at least one of which is given."""
+        if subject is not None:
+            if predicate is not None:  # s, p, ???
+                by_object = self._spog.get(subject, {}).get(predicate, {})
+                if object is not None:  # s, p, o
+                    for graph in by_object.get(object, ()):
+                        yield Quad(subject, predicate, object, graph)
+                else:  # s, p, ?var
+                    for object, graphs in by_object.items():
+                        for graph in graphs:
+                            yield Quad(subject, predicate, object, graph)
+            elif object is not None:  # s, ?var, o
+                for predicate, graphs in (
+                    self._ospg.get(object, {}).get(subject, {}).items()
+                ):
+                    for graph in graphs:
+                        yield Quad(subject, predicate, object, graph)
+            else:  # s, ?var, ?var
+                for predicate, by_object in self._spog.get(subject, {}).items():
+                    for object, graphs in by_object.items():
+                        for graph in graphs:
+                            yield Quad(subject, predicate, object, graph)
+        elif predicate is not None:  # ?var, p, ???
+            by_object = self._posg.get(predicate, {})
+            if object is not None:  # ?var, p, o
+                for subject, graphs in by_object.get(object, {}).items():
+                    for graph in graphs:
+                        yield Quad(subject, predicate, object, graph)
+            else:  # ?var, p, ?var
+                for object, by_subject in by_object.items():
+                    for subject, graphs in by_subject.items():
+                        for graph in graphs:
+                            yield Quad(subject, predicate, object, graph)
+        elif object is not None:  # ?var, ?var, o
+            for subject, by_predicate in self._ospg.get(object, {}).items():
+                for predicate, graphs in by_predicate.items():
+                    for graph in graphs:
+                        yield Quad(subject, predicate, object, graph)
+
+    def count(self, subject=None, predicate=None, object=None, graph=None):
+        """Returns the number of quads :py:meth:`match` would return for the
+        same arguments, without materializing them. Counts within a graph are
+        delegated to :py:meth:`Graph.count`; otherwise they are answered from
+        the cross-graph indexes."""
+        if graph:
+            if graph in self._graphs:
+                return self._graphs[graph].count(subject, predicate, object)
+            return 0
+        pattern = self._pattern(subject, predicate, object)
+        if pattern is None:
+            return 0
+        subject, predicate, object = pattern
+        if subject is not None:
+            by_predicate = self._spog.get(subject, {})
+            if predicate is not None:
+                if object is not None:
+                    return len(by_predicate.get(predicate, {}).get(object, ()))
+                return sum(map(len, by_predicate.get(predicate, {}).values()))
+            elif object is not None:
+                by_predicate = self._ospg.get(object, {}).get(subject, {})
+                return sum(map(len, by_predicate.values()))
+            return sum(
+                len(graphs)
+                for by_object in by_predicate.values()
+                for graphs in by_object.values()
+            )
+        elif predicate is not None:
+            if object is not None:
+                by_subject = self._posg.get(predicate, {}).get(object, {})
+                return sum(map(len, by_subject.values()))
+            return self._predicate_counts.get(predicate, 0)
+        elif object is not None:
+            return sum(
+                len(graphs)
+                for by_predicate in self._ospg.get(object, {}).values()
+                for graphs in by_predicate.values()
+            )
+        return self._size
+
+    def predicate_counts(self):
+        """Returns a dictionary of the number of quads using each predicate
+        across all of the graphs in the dataset."""
+        return dict(
+            zip(
+                self._decode_keys(self._predicate_counts.keys()),
+                self._predicate_counts.values(),
+            )
+        )
 
     def removeMatches(self, subject=None, predicate=None, object=None, graph=None):
         """This method removes those triples in the current graph which match
         the given arguments."""
-        for quad in self.match(subject, predicate, object, graph):
+        for quad in list(self.match(subject, predicate, object, graph)):
             self.remove(quad)
         return self
 
+    def transaction(self):
+        """Returns a :py:class:`Transaction` which buffers changes to the
+        quads of this dataset and applies them together."""
+        return Transaction(self)
+
     def addAll(self, dataset_or_quads):
         """Imports the graph or set of triples in to this graph. This method
-        returns the graph instance it was called on."""
-        for quad in dataset_or_quads:
-            self.add(quad)
+        returns the graph instance it was called on.
+
+        Consecutive quads in the same graph are handed to
+        :py:meth:`Graph.addAll` together, so loading N-Quads that are grouped
+        by graph takes the bulk-load path."""
+        for graph_name, quads in groupby(dataset_or_quads, itemgetter(3)):
+            self._graph(graph_name).addAll(map(q_as_t, quads))
         return self
 
     def __len__(self):
-        return sum(len(g) for g in self.graphs)
+        return self._size
 
     def __contains__(self, item):
         if hasattr(item, "graph"):
@@ -563,9 +1665,11 @@ class Dataset:
                 graph = self._graphs[item.graph]
                 return q_as_t(item) in graph
         else:
-            for graph in self._graphs.values():
-                if item in graph:
-                    return True
+            pattern = self._pattern(item[0], item[1], item[2])
+            if pattern is None:
+                return False
+            s, p, o = pattern
+            return o in self._spog.get(s, {}).get(p, {})
 
     def __iter__(self):
         for graph in self._graphs.values():
@@ -579,6 +1683,43 @@ class Dataset:
 # RDF Enviroment Interfaces
 
 
+class _PrefixIndex:
+    """The namespaces of a `PrefixMap` in sorted order, each with the position
+    of the longest other namespace it starts with, so that the longest
+    namespace an IRI starts with can be found with a binary search.
+
+    That namespace starts every string sorted between it and the IRI, so it
+    is among the namespaces the one sorted just before the IRI starts with,
+    and the first of those the IRI also starts with."""
+
+    def __init__(self, prefixes):
+        prefix_of = {}
+        for prefix, namespace in prefixes.items():
+            # The first prefix of a namespace wins, as in a scan.
+            prefix_of.setdefault(namespace, prefix)
+        self.namespaces = sorted(prefix_of)
+        self.prefixes = [prefix_of[namespace] for namespace in self.namespaces]
+        self.parents = []
+        ancestors = []
+        for i, namespace in enumerate(self.namespaces):
+            while ancestors and not namespace.startswith(
+                self.namespaces[ancestors[-1]]
+            ):
+                ancestors.pop()
+            self.parents.append(ancestors[-1] if ancestors else -1)
+            ancestors.append(i)
+
+    def match(self, iri):
+        """Return the prefix and namespace of the longest namespace iri starts
+        with, or None."""
+        i = bisect_right(self.namespaces, iri) - 1
+        while i >= 0:
+            if iri.startswith(self.namespaces[i]):
+                return self.prefixes[i], self.namespaces[i]
+            i = self.parents[i]
+        return None
+
+
 class PrefixMap(collections.OrderedDict):
     """A map of prefixes to IRIs, and provides methods to
     turn one in to the other.
@@ -626,6 +1767,50 @@ class PrefixMap(collections.OrderedDict):
         IRI is returned."""
         return to_curie(iri, self)
 
+    def _longest_match(self, iri):
+        """Return the prefix and namespace of the longest namespace iri starts
+        with, or None. The index this searches is rebuilt after the map
+        changes."""
+        index = self.__dict__.get("_index")
+        if index is None:
+            index = self._index = _PrefixIndex(self)
+        return index.match(iri)
+
+    # Every change to the map drops the index.
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._index = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._index = None
+
+    def pop(self, *args):
+        self._index = None
+        return super().pop(*args)
+
+    def popitem(self, last=True):
+        self._index = None
+        return super().popitem(last)
+
+    def setdefault(self, key, default=None):
+        self._index = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._index = None
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._index = None
+        super().clear()
+
+    def move_to_end(self, key, last=True):
+        # Which of two prefixes of a namespace is used depends on the order.
+        self._index = None
+        super().move_to_end(key, last)
+
     def addAll(self, other, override=False):
         if override:
             self.update(other)
@@ -709,12 +1894,101 @@ class TermMap(dict):
         """Given an IRI for which an term is known (for example
         "http://www.w3.org/2000/01/rdf-schema#label") this method returns a
         term (for example "label"), if no term is known the original IRI is
-        returned."""
-        for term, v in self.items():
-            if v == iri:
-                return term
+        returned.
+
+        A reverse index of IRIs to terms is built on the first call, and kept
+        up to date as the map changes."""
+        terms = self._reverse_index().get(iri)
+        return next(iter(terms)) if terms else iri
+
+    def __reduce__(self):
+        # Copies and pickles rebuild the reverse index, rather than sharing it.
+        state = {
+            k: v
+            for k, v in self.__dict__.items()
+            if k not in ("_reverse", "_next_position")
+        }
+        return (type(self), (), state or None, None, iter(self.items()))
+
+    def _reverse_index(self):
+        """Returns a dict of each IRI to a dict of the terms for it, in the
+        order they come in the map, to their positions in it. The first term
+        for an IRI is the one it shrinks to, as in a scan of the map."""
+        reverse = self.__dict__.get("_reverse")
+        if reverse is None:
+            reverse = {}
+            for position, (term, iri) in enumerate(self.items()):
+                reverse.setdefault(iri, {})[term] = position
+            self._reverse = reverse
+            self._next_position = len(self)
+        return reverse
+
+    def _forget(self, term, iri):
+        """Update the reverse index after term, for iri, is removed. Returns
+        the position term had in the map."""
+        reverse = self.__dict__.get("_reverse")
+        if reverse is None:
+            return None
+        terms = reverse[iri]
+        position = terms.pop(term)
+        if not terms:
+            del reverse[iri]
+        return position
+
+    def __setitem__(self, term, iri):
+        reverse = self.__dict__.get("_reverse")
+        if reverse is None:
+            super().__setitem__(term, iri)
+            return
+        if term in self:
+            # A changed term keeps its place in the map.
+            position = self._forget(term, self[term])
+        else:
+            position = self._next_position
+            self._next_position += 1
+        super().__setitem__(term, iri)
+        terms = reverse.setdefault(iri, {})
+        last = next(reversed(terms.values()), -1)
+        terms[term] = position
+        if position < last:
+            reverse[iri] = dict(sorted(terms.items(), key=itemgetter(1)))
+
+    def __delitem__(self, term):
+        iri = self[term]
+        super().__delitem__(term)
+        self._forget(term, iri)
+
+    def pop(self, term, *default):
+        if term not in self:
+            return super().pop(term, *default)
+        iri = super().pop(term)
+        self._forget(term, iri)
         return iri
 
+    def popitem(self):
+        term, iri = super().popitem()
+        self._forget(term, iri)
+        return term, iri
+
+    def setdefault(self, term, iri=None):
+        if term not in self:
+            self[term] = iri
+        return self[term]
+
+    def update(self, *args, **kwargs):
+        # dict.update doesn't call __setitem__.
+        for term, iri in dict(*args, **kwargs).items():
+            self[term] = iri
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        self.__dict__.pop("_reverse", None)
+        self.__dict__.pop("_next_position", None)
+
 
 class Profile:
     """Profiles provide an easy to use context for negotiating between CURIEs,
@@ -1,52 +1,369 @@
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import ExitStack, contextmanager
+import heapq
+import io
+from itertools import chain, groupby, islice, repeat
+import logging
+import multiprocessing
+from operator import itemgetter
+import os
+import pathlib
+import pickle
+import re
+import tempfile
+import threading
+from time import perf_counter
+
+from pymantic.compression import open_output
+
+log = logging.getLogger(__name__)
+
+# Characters which must be escaped in ntriples and nquads strings and IRIs.
+_NT_UNSAFE = re.compile(r"[^\x20\x21\x23-\x5B\x5D-\x7E]")
+
+
+class _NTEscapes(dict):
+    """A str.translate table of the ntriples escape for every character,
+    filled in as characters are first seen."""
+
+    def __missing__(self, ordinal):
+        if ordinal > 0xFFFF:
+            escape = "\\U%08X" % ordinal
+        elif _NT_UNSAFE.match(chr(ordinal)):
+            escape = "\\u%04X" % ordinal
+        else:
+            escape = chr(ordinal)
+        self[ordinal] = escape
+        return escape
+
+
+_NT_ESCAPES = _NTEscapes(
+    {
+        ord("\t"): "\\t",
+        ord("\b"): "\\b",
+        ord("\n"): "\\n",
+        ord("\r"): "\\r",
+        ord("\f"): "\\f",
+        ord('"'): '\\"',
+        ord("\\"): "\\\\",
+    }
+)
 
 
 def nt_escape(node_string):
     """Properly escape strings for n-triples and n-quads serialization."""
-    output_string = ""
-    for char in node_string:
-        if char == "\u0009":
-            output_string += "\\t"
-        elif char == "\u000A":
-            output_string += "\\n"
-        elif char == "\u000D":
-            output_string += "\\r"
-        elif char == "\u0022":
-            output_string += '\\"'
-        elif char == "\u005C":
-            output_string += "\\\\"
-        elif (
-            char >= "\u0020"
-            and char <= "\u0021"
-            or char >= "\u0023"
-            and char <= "\u005B"
-            or char >= "\u005D"
-            and char <= "\u007E"
-        ):
-            output_string += char
-        elif char >= "\u007F" and char <= "\uFFFF":
-            output_string += "\\u%04X" % ord(char)
-        elif char >= "\U00010000" and char <= "\U0010FFFF":
-            output_string += "\\U%08X" % ord(char)
-    return output_string
-
-
-def serialize_ntriples(graph, f):
-    """Serialize some graph to f as ntriples."""
-    for triple in graph:
-        f.write(str(triple))
-
-
-def serialize_nquads(dataset, f):
-    """Serialize some graph to f as nquads."""
-    for quad in dataset:
-        f.write(str(quad))
+    if _NT_UNSAFE.search(node_string) is None:
+        return node_string
+    return node_string.translate(_NT_ESCAPES)
+
+
+class NTriplesWriter:
+    """Write triples (or quads) to f as ntriples (or nquads), joining the
+    lines into writes of at least buffer_size characters.
+
+    f may be a text stream, a binary stream, to which UTF-8 is written
+    directly, or a path or binary stream to write compressed as
+    :py:func:`pymantic.compression.open_output` describes.
+
+    If sort is true, the lines are written in sorted order, and if unique is
+    true, repeated lines are only written once. Both need memory for every
+    line, and sorted lines are only written when the writer is closed.
+
+    Usage::
+
+      with NTriplesWriter(Path("dump.nq.gz")) as writer:
+          writer.write_all(dataset)
+      print(writer.statements, "quads at", writer.rate, "per second")
+    """
+
+    # Lines are formatted and joined this many at a time.
+    batch_size = 1024
+
+    def __init__(
+        self, f, compression=None, buffer_size=1 << 20, sort=False, unique=False
+    ):
+        self.buffer_size = buffer_size
+        self.statements = 0
+        self._exit = ExitStack()
+        if compression is None and isinstance(f, (io.BufferedIOBase, io.RawIOBase)):
+            self._write = lambda chunk: f.write(chunk.encode("utf-8"))
+        else:
+            self._write = self._exit.enter_context(open_output(f, compression)).write
+        self._pending = []
+        self._pending_size = 0
+        self._seen = set() if unique and not sort else None
+        if sort:
+            self._held = set() if unique else []
+        else:
+            self._held = None
+        self._start = perf_counter()
+        self._end = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def elapsed(self):
+        """Seconds since the writer was opened, until it was closed."""
+        return (self._end or perf_counter()) - self._start
+
+    @property
+    def rate(self):
+        """Statements written per second."""
+        return self.statements / self.elapsed
+
+    def write(self, statement):
+        self.write_all((statement,))
+
+    def write_all(self, statements):
+        lines = self._lines(statements)
+        if self._held is not None:
+            if isinstance(self._held, set):
+                self._held.update(lines)
+            else:
+                self._held.extend(lines)
+            return
+        if self._seen is not None:
+            lines = self._unseen(lines)
+        self._buffer(lines)
+
+    def _lines(self, statements):
+        # toNT caches the ntriples forms of terms itself.
+        for statement in statements:
+            s, p, o = statement[0], statement[1], statement[2]
+            terms = f"{s.toNT()} {p.toNT()} {o.toNT()}"
+            if len(statement) == 4 and statement[3] is not None:
+                yield f"{terms} {statement[3].toNT()} .\n"
+            else:
+                yield terms + " .\n"
+
+    def _unseen(self, lines):
+        seen = self._seen
+        for line in lines:
+            if line not in seen:
+                seen.add(line)
+                yield line
+
+    def _buffer(self, lines):
+        batch_size = self.batch_size
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                break
+            self.write_formatted("".join(batch), len(batch))
+
+    def write_formatted(self, chunk, statements):
+        """Write chunk, the already formatted lines of some number of
+        statements, as :py:func:`serialize_parallel` does with the lines
+        formatted by its workers. The lines are written as they are, even if
+        the writer sorts or removes repeated lines."""
+        self.statements += statements
+        self._pending.append(chunk)
+        self._pending_size += len(chunk)
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write out any buffered lines, except those held to be sorted."""
+        if self._pending:
+            self._write("".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def close(self):
+        """Write out any remaining lines, and close a file the writer
+        opened."""
+        if self._end is not None:
+            return
+        if self._held is not None:
+            held, self._held = self._held, None
+            self._buffer(iter(sorted(held)))
+        self.flush()
+        self._exit.close()
+        self._end = perf_counter()
+        log.debug(
+            "Wrote %d statements in %.2fs (%.0f/s)",
+            self.statements,
+            self.elapsed,
+            self.rate if self.elapsed else 0,
+        )
+
+
+def serialize_ntriples(graph, f, compression=None):
+    """Serialize some graph to f as ntriples. f may be a text stream, or a
+    path or binary stream to write compressed as
+    :py:func:`pymantic.compression.open_output` describes."""
+    with NTriplesWriter(f, compression) as writer:
+        writer.write_all(graph)
+
+
+def serialize_nquads(dataset, f, compression=None):
+    """Serialize some graph to f as nquads. f may be a text stream, or a path
+    or binary stream to write compressed as
+    :py:func:`pymantic.compression.open_output` describes."""
+    with NTriplesWriter(f, compression) as writer:
+        writer.write_all(dataset)
+
+
+# The units serialize_parallel or serialize_shards has partitioned its graph
+# or dataset into, and a function giving the statements of a unit, while a
+# pool of forked workers, which inherit them, is running. Formatting in this
+# process is given them as arguments instead.
+_parallel_units = None
+_parallel_statements = None
+_parallel_lock = threading.Lock()
+
+_CAN_FORK = "fork" in multiprocessing.get_all_start_methods()
+
+
+def _graph_statements(graph):
+    from pymantic.primitives import t_as_q
+
+    return (t_as_q(graph.uri, triple) for triple in graph)
+
+
+def _partition(source, partition):
+    """Return the units to partition source into, and a function giving the
+    statements of a unit."""
+    if partition == "subject":
+        return list(source.subjects()), source.match
+    elif partition == "graph":
+        return list(source.graphs), _graph_statements
+    raise ValueError(f"Unknown partition: {partition!r}")
+
+
+def _format_units(units, statements, path=None, compression=None):
+    """Format the statements of units, writing them to path or returning them
+    as text. Returns the text (or None) and the number of statements
+    formatted."""
+    f = io.StringIO() if path is None else path
+    with NTriplesWriter(f, compression) as writer:
+        writer.write_all(chain.from_iterable(map(statements, units)))
+    return (f.getvalue() if path is None else None), writer.statements
+
+
+def _format_partition(part, parts, path=None, compression=None):
+    """Format every parts-th unit of the source, starting from part, in a
+    forked worker."""
+    return _format_units(
+        _parallel_units[part::parts], _parallel_statements, path, compression
+    )
+
+
+@contextmanager
+def _forked_pool(workers, units, statements):
+    """Yield a pool of workers forked with units and statements, or None if
+    the parts must be formatted in this process: where processes can't be
+    forked, or where other threads are running, since a forked worker could
+    be left holding a copy of a lock one of them had taken."""
+    global _parallel_units, _parallel_statements
+    if not _CAN_FORK:
+        yield None
+        return
+    if threading.active_count() > 1 or not _parallel_lock.acquire(blocking=False):
+        log.info("Other threads are running, so formatting in this process")
+        yield None
+        return
+    _parallel_units = units
+    _parallel_statements = statements
+    try:
+        with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            yield executor
+    finally:
+        _parallel_units = _parallel_statements = None
+        _parallel_lock.release()
+
+
+def serialize_parallel(
+    source, f, workers=None, partition="subject", ordered=True, compression=None
+):
+    """Serialize a graph to f as ntriples, or a dataset as nquads, formatting
+    parts of it in a pool of worker processes. f is as for
+    :py:class:`NTriplesWriter`.
+
+    The source is partitioned by "subject" or, for a dataset, by "graph", into
+    four parts per worker. If ordered is true, the parts are written in the
+    same order every time; otherwise each is written as soon as it is ready.
+    At most two parts per worker are waiting to be written at once.
+
+    The workers are forked, so they share the source rather than copying it,
+    and blank nodes keep their labels. Forking is only safe while no other
+    thread is running: where processes can't be forked, or other threads are
+    running, the parts are formatted one after another in this process
+    instead, which is logged at info level."""
+    workers = workers or os.cpu_count() or 1
+    parts = workers * 4
+    units, statements = _partition(source, partition)
+    with NTriplesWriter(f, compression) as writer, _forked_pool(
+        workers, units, statements
+    ) as executor:
+        if executor is None:
+            for part in range(parts):
+                writer.write_formatted(*_format_units(units[part::parts], statements))
+            return
+        pending = deque() if ordered else set()
+        for part in range(parts):
+            if len(pending) >= 2 * workers:
+                if ordered:
+                    done = (pending.popleft(),)
+                else:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    writer.write_formatted(*future.result())
+            future = executor.submit(_format_partition, part, parts)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+        for future in pending if ordered else as_completed(pending):
+            writer.write_formatted(*future.result())
+
+
+def serialize_shards(
+    source, paths, workers=None, partition="subject", compression=None
+):
+    """Serialize a graph as ntriples, or a dataset as nquads, to the files at
+    paths, one part of it to each, formatting and writing them in a pool of
+    worker processes. The source is partitioned, and the workers forked, as
+    for :py:func:`serialize_parallel`, into one part per path, and the files
+    are compressed as their extensions name, or with compression.
+
+    Returns a list of the number of statements written to each file."""
+    paths = [pathlib.Path(path) for path in paths]
+    shards = len(paths)
+    units, statements = _partition(source, partition)
+    with _forked_pool(workers, units, statements) as executor:
+        if executor is None:
+            results = (
+                _format_units(units[shard::shards], statements, path, compression)
+                for shard, path in enumerate(paths)
+            )
+        else:
+            results = executor.map(
+                _format_partition,
+                range(shards),
+                repeat(shards),
+                paths,
+                repeat(compression),
+            )
+        return [count for _, count in results]
 
 
 def default_bnode_name_generator():
     i = 0
     while True:
-        yield "_b" + str(i)
+        yield "_:b" + str(i)
         i += 1
 
 
@@ -83,7 +400,7 @@ def turtle_repr(node, profile, name_map, bnode_name_maker, base=None):
         if node in name_map:
             name = name_map[node]
         else:
-            name = bnode_name_maker.next()
+            name = next(bnode_name_maker)
             name_map[node] = name
     elif node.interfaceName == "Literal":
         if node.datatype == profile.resolve("xsd:string"):
@@ -115,12 +432,189 @@ def turtle_sorted_names(nodes, name_maker):
 
 
 def serialize_turtle(
-    graph, f, base=None, profile=None, bnode_name_generator=default_bnode_name_generator
+    graph,
+    f,
+    base=None,
+    profile=None,
+    bnode_name_generator=default_bnode_name_generator,
+    compression=None,
+    order="name",
+    run_size=1 << 16,
 ):
     """Serialize a graph to f as turtle, optionally using base IRI base
-    and prefix map from profile. If provided, subject_key will be used to order
-    subjects, and predicate_key predicates within a subject."""
+    and prefix map from profile. f may be a path or binary stream to write
+    compressed, as with :py:func:`serialize_ntriples`.
+
+    A blank node which is the object of only one statement is written inline
+    there, as a ``( ... )`` collection if it heads a well-formed list and as a
+    ``[ ... ]`` property list otherwise.
+
+    order is one of:
+
+    * ``"name"``, the default: subjects are sorted by their turtle names, in
+      memory.
+    * ``"index"``: subjects are written in the order of the graph's index as
+      they are reached, without holding the whole output or every subject
+      name in memory. graph may also be an iterable of triples grouped by
+      subject; a subject whose triples aren't together is written more than
+      once, which is still valid turtle, and blank nodes are only written
+      inline if graph has a ``match`` method to look them up.
+    * ``"external"``: as ``"index"``, but sorted by name through temporary
+      files of run_size subjects each, so the order is deterministic
+      without the whole output in memory. Blank nodes are labelled in the
+      order they are reached, so their labels may differ from ``"name"``.
+
+    Memory use of the streaming orders grows only with the number of blank
+    nodes, whose reference counts and labels are kept."""
+    if order not in ("name", "index", "external"):
+        raise ValueError(f"Unknown order: {order!r}")
+    with open_output(f, compression) as f:
+        _serialize_turtle(
+            graph, f, base, profile, bnode_name_generator, order, run_size
+        )
+
+
+_RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+_RDF_FIRST = _RDF + "first"
+_RDF_REST = _RDF + "rest"
+_RDF_NIL = _RDF + "nil"
+
+_TURTLE_NAMES_LIMIT = 1 << 16
+
+
+def _subject_index(graph):
+    """Return a mapping of each subject of graph to a mapping of its
+    predicates to iterables of their objects: the graph's own SPO index if it
+    has one, otherwise one built in a single pass over its statements."""
+    spo = getattr(graph, "_spo", None)
+    if isinstance(spo, dict) and getattr(graph, "_terms", None) is None:
+        return spo
+    index = {}
+    for statement in graph:
+        predicates = index.setdefault(statement[0], {})
+        predicates.setdefault(statement[1], []).append(statement[2])
+    return index
+
+
+def _subject_groups(graph):
+    """Yield each subject of graph with a mapping of its predicates to
+    iterables of their objects, from the graph's own SPO index if it has one,
+    otherwise by grouping consecutive statements by subject (merging a
+    CompactGraph first, so that it iterates in SPO order)."""
+    spo = getattr(graph, "_spo", None)
+    if isinstance(spo, dict):
+        terms = getattr(graph, "_terms", None)
+        if terms is None:
+            yield from spo.items()
+            return
+        decode = terms.__getitem__
+        for subject, predicates in spo.items():
+            yield decode(subject), {
+                decode(predicate): map(decode, objects)
+                for predicate, objects in predicates.items()
+            }
+        return
+    compact = getattr(graph, "_compact", None)
+    if compact is not None:
+        # A CompactGraph iterates in SPO order once it is merged in to a
+        # single run, so each subject's statements come together.
+        compact()
+    for subject, statements in groupby(graph, itemgetter(0)):
+        predicates = {}
+        for statement in statements:
+            predicates.setdefault(statement[1], []).append(statement[2])
+        yield subject, predicates
+
 
+def _subject_lookup(graph):
+    """Return a function which returns a mapping of the predicates of a
+    subject of graph to iterables of their objects, or None if it isn't a
+    subject. Returns None if graph is only an iterable of statements."""
+    spo = getattr(graph, "_spo", None)
+    if isinstance(spo, dict):
+        terms = getattr(graph, "_terms", None)
+        if terms is None:
+            return spo.get
+
+        def lookup(subject):
+            key = terms.lookup(subject)
+            if key is None or key not in spo:
+                return None
+            return {
+                terms[predicate]: [terms[o] for o in objects]
+                for predicate, objects in spo[key].items()
+            }
+
+        return lookup
+    if not hasattr(graph, "match"):
+        return None
+
+    def lookup(subject):
+        predicates = {}
+        for statement in graph.match(subject=subject):
+            predicates.setdefault(statement[1], []).append(statement[2])
+        return predicates or None
+
+    return lookup
+
+
+def _blank_references(graph, spo=None):
+    """Count the statements each blank node of graph is the object of, in
+    one pass over the graph's OSP index if it has one, otherwise over spo, a
+    mapping as returned by `_subject_index`, or the graph's statements."""
+    from pymantic.primitives import BlankNode
+
+    counts = {}
+    osp = getattr(graph, "_osp", None)
+    if isinstance(osp, dict):
+        terms = getattr(graph, "_terms", None)
+        for key, subjects in osp.items():
+            node = key if terms is None else terms[key]
+            if isinstance(node, BlankNode):
+                counts[node] = sum(map(len, subjects.values()))
+        return counts
+    if spo is not None:
+        objects = chain.from_iterable(
+            chain.from_iterable(predicates.values()) for predicates in spo.values()
+        )
+    else:
+        objects = (statement[2] for statement in graph)
+    for node in objects:
+        if isinstance(node, BlankNode):
+            counts[node] = counts.get(node, 0) + 1
+    return counts
+
+
+def _pickled(f):
+    """Yield the objects pickled one after another in f."""
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+def _external_sort(blocks, run_size):
+    """Yield (name, text) blocks sorted by name, by sorting runs of run_size
+    blocks in memory, writing each run to a temporary file and merging the
+    files."""
+    with ExitStack() as stack:
+        runs = []
+        while True:
+            run = sorted(islice(blocks, run_size), key=itemgetter(0))
+            if not run:
+                break
+            f = stack.enter_context(tempfile.TemporaryFile())
+            for block in run:
+                pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+            f.seek(0)
+            runs.append(_pickled(f))
+        yield from heapq.merge(*runs, key=itemgetter(0))
+
+
+def _serialize_turtle(
+    graph, f, base, profile, bnode_name_generator, order="name", run_size=1 << 16
+):
     if base is not None:
         f.write("@base <" + base + "> .\n")
     if profile is None:
@@ -133,37 +627,136 @@ def serialize_turtle(
 
     name_map = OrderedDict()
     bnode_name_maker = bnode_name_generator()
+    # Blank node names are kept in name_map, so this can be cleared.
+    names = {}
 
     def name_maker(n):
-        return turtle_repr(n, profile, name_map, bnode_name_maker, base)
-
-    from pymantic.rdf import List
-
-    subjects = [subj for subj in graph.subjects() if not List.is_list(subj, graph)]
-
-    for subject_name, subject in turtle_sorted_names(subjects, name_maker):
-        subj_indent_size = len(subject_name) + 1
-        f.write(subject_name + " ")
-        predicates = set(t.predicate for t in graph.match(subject=subject))
-        sorted_predicates = turtle_sorted_names(predicates, name_maker)
-        for i, (predicate_name, predicate) in enumerate(sorted_predicates):
-            if i != 0:
-                f.write(" " * subj_indent_size)
-            pred_indent_size = subj_indent_size + len(predicate_name) + 1
-            f.write(predicate_name + " ")
-            for j, triple in enumerate(
-                graph.match(subject=subject, predicate=predicate)
-            ):
-                if j != 0:
-                    f.write(",\n" + " " * pred_indent_size)
-                if List.is_list(triple.object, graph):
-                    f.write("(")
-                    for k, o in enumerate(List(graph, triple.object)):
-                        if k != 0:
-                            f.write(" ")
-                        f.write(name_maker(o))
-                    f.write(")")
+        name = names.get(n)
+        if name is None:
+            if len(names) >= _TURTLE_NAMES_LIMIT:
+                names.clear()
+            name = names[n] = turtle_repr(n, profile, name_map, bnode_name_maker, base)
+        return name
+
+    if order == "name":
+        spo = _subject_index(graph)
+        lookup = spo.get
+        references = _blank_references(graph, spo)
+    else:
+        lookup = _subject_lookup(graph)
+        references = {} if lookup is None else _blank_references(graph)
+    # Blank nodes which are the object of one statement are written there,
+    # as a collection or a property list, rather than as subjects.
+    inline = {node for node, count in references.items() if count == 1}
+    emitted = set()
+
+    def collection(node):
+        """Return the items and nodes of the well-formed list node heads, or
+        None."""
+        items = []
+        nodes = []
+        seen = set()
+        while node != _RDF_NIL:
+            if node not in inline or node in emitted or node in seen:
+                return None
+            predicates = lookup(node)
+            if predicates is None or len(predicates) != 2:
+                return None
+            firsts = list(predicates.get(_RDF_FIRST, ()))
+            rests = list(predicates.get(_RDF_REST, ()))
+            if len(firsts) != 1 or len(rests) != 1:
+                return None
+            items.append(firsts[0])
+            nodes.append(node)
+            seen.add(node)
+            node = rests[0]
+        return items, nodes
+
+    def inline_name(node, column):
+        found = collection(node)
+        if found is not None:
+            items, nodes = found
+            emitted.update(nodes)
+            names = []
+            column += 1
+            for item in items:
+                name = object_name(item, column)
+                names.append(name)
+                newline = name.rfind("\n")
+                if newline < 0:
+                    column += len(name) + 1
                 else:
-                    f.write(name_maker(triple.object))
-            f.write(" ;\n")
-        f.write(" " * subj_indent_size + ".\n\n")
+                    column = len(name) - newline
+            return "(" + " ".join(names) + ")"
+        emitted.add(node)
+        predicates = lookup(node)
+        if not predicates:
+            return "[]"
+        column += 2
+        parts = predicate_objects(predicates, column)
+        return "[ " + (" ;\n" + " " * column).join(parts) + " ]"
+
+    def object_name(node, column):
+        """Name node, written as an object starting at column."""
+        if node in inline and node not in emitted:
+            return inline_name(node, column)
+        return name_maker(node)
+
+    def predicate_objects(predicates, column):
+        """Return a predicate and its objects for each of predicates, sorted
+        by name, with the lines after the first indented to column."""
+        sorted_predicates = [(name_maker(p), p) for p in predicates]
+        sorted_predicates.sort(key=itemgetter(0))
+        parts = []
+        for predicate_name, predicate in sorted_predicates:
+            object_column = column + len(predicate_name) + 1
+            separator = ",\n" + " " * object_column
+            parts.append(
+                predicate_name
+                + " "
+                + separator.join(
+                    object_name(o, object_column) for o in predicates[predicate]
+                )
+            )
+        return parts
+
+    def block(subject_name, predicates):
+        indent = " " * (len(subject_name) + 1)
+        parts = predicate_objects(predicates, len(indent))
+        separator = " ;\n" + indent
+        return subject_name + " " + separator.join(parts) + separator + ".\n\n"
+
+    def unreached():
+        """Yield blocks for the blank nodes to be written inline which weren't
+        reached from a subject, because they refer to each other in a
+        cycle."""
+        for node in references:
+            if node in inline and node not in emitted:
+                predicates = lookup(node)
+                if predicates:
+                    emitted.add(node)
+                    subject_name = name_maker(node)
+                    yield subject_name, block(subject_name, predicates)
+
+    if order == "name":
+        subjects = [(name_maker(s), s) for s in spo if s not in inline]
+        subjects.sort(key=itemgetter(0))
+        for subject_name, subject in subjects:
+            f.write(block(subject_name, spo[subject]))
+        for _, text in unreached():
+            f.write(text)
+        return
+
+    def blocks():
+        for subject, predicates in _subject_groups(graph):
+            if subject not in inline:
+                subject_name = name_maker(subject)
+                yield subject_name, block(subject_name, predicates)
+        yield from unreached()
+
+    if order == "external":
+        sorted_blocks = _external_sort(blocks(), run_size)
+    else:
+        sorted_blocks = blocks()
+    for _, text in sorted_blocks:
+        f.write(text)
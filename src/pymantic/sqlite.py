@@ -0,0 +1,522 @@
+"""Graphs and datasets stored in an SQLite database, so that a large graph can
+be parsed once and reopened instantly afterwards.
+
+Usage::
+
+  from pymantic.parsers import ntriples_parser
+  from pymantic.sqlite import SQLiteGraph
+
+  graph = SQLiteGraph("graph.db")
+  with open("triples.nt") as f:
+      ntriples_parser.parse(f, graph)
+  graph.close()
+
+  # Later, or in another process:
+  graph = SQLiteGraph("graph.db")
+"""
+
+__all__ = ["SQLiteGraph", "SQLiteDataset"]
+
+from contextlib import contextmanager
+import sqlite3
+
+from pymantic.primitives import (
+    BlankNode,
+    Literal,
+    NamedNode,
+    Quad,
+    Transaction,
+    Triple,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT,
+    language TEXT NOT NULL,
+    datatype TEXT NOT NULL,
+    UNIQUE (value, kind, language, datatype)
+);
+CREATE TABLE IF NOT EXISTS quads (
+    g INTEGER NOT NULL,
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (g, s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quads_gpos ON quads (g, p, o, s);
+CREATE INDEX IF NOT EXISTS quads_gosp ON quads (g, o, s, p);
+"""
+
+# Indexes for patterns that don't name a graph, only created for datasets.
+_DATASET_SCHEMA = """
+CREATE INDEX IF NOT EXISTS quads_spog ON quads (s, p, o, g);
+CREATE INDEX IF NOT EXISTS quads_posg ON quads (p, o, s, g);
+CREATE INDEX IF NOT EXISTS quads_ospg ON quads (o, s, p, g);
+"""
+
+# The graph ID of the triples of an unnamed SQLiteGraph, which are also the
+# default graph of an SQLiteDataset. No term is stored under this ID.
+_DEFAULT_GRAPH = 0
+
+# Rows are inserted this many at a time by addAll.
+_BATCH_SIZE = 10000
+
+
+_TERM_COLUMNS = ("id", "kind", "value", "language", "datatype")
+
+
+def _term_columns(alias):
+    return ", ".join(f"{alias}.{column}" for column in _TERM_COLUMNS)
+
+
+class _SQLiteTerms:
+    """The term dictionary of an SQLite store: maps terms to the integer IDs
+    they are stored under in the quads table, and rows of the terms table
+    back to terms.
+
+    Blank nodes have no name of their own, so each `BlankNode` stored is
+    given a fresh ID, and reading that ID back always gives the same
+    `BlankNode` object for as long as the store is open. The blank nodes
+    stored since the last commit are forgotten if the transaction storing
+    them is rolled back, since their IDs may then be given to other terms."""
+
+    def __init__(self, db):
+        self.db = db
+        self._blank_ids = {}
+        self._blanks = {}
+        self._uncommitted = []
+
+    @staticmethod
+    def _key(term):
+        if isinstance(term, Literal):
+            return ("l", term.value, term.language or "", term.datatype or "")
+        return ("u", str(term), "", "")
+
+    def lookup(self, term):
+        """Return the ID of term, or None if it has never been stored."""
+        if isinstance(term, BlankNode):
+            return self._blank_ids.get(term)
+        kind, value, language, datatype = self._key(term)
+        row = self.db.execute(
+            "SELECT id FROM terms "
+            "WHERE value = ? AND kind = ? AND language = ? AND datatype = ?",
+            (value, kind, language, datatype),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def intern(self, term):
+        """Return the ID of term, storing it if necessary."""
+        term_id = self.lookup(term)
+        if term_id is not None:
+            return term_id
+        if isinstance(term, BlankNode):
+            term_id = self.db.execute(
+                "INSERT INTO terms (kind, value, language, datatype) "
+                "VALUES ('b', NULL, '', '')"
+            ).lastrowid
+            self._blank_ids[term] = term_id
+            self._blanks[term_id] = term
+            self._uncommitted.append(term)
+            return term_id
+        return self.db.execute(
+            "INSERT INTO terms (kind, value, language, datatype) VALUES (?, ?, ?, ?)",
+            self._key(term),
+        ).lastrowid
+
+    def decode(self, term_id, kind, value, language, datatype):
+        """Make a term from a row of the terms table."""
+        if kind == "u":
+            return NamedNode(value)
+        elif kind == "l":
+            return Literal(
+                value, language or None, NamedNode(datatype) if datatype else None
+            )
+        elif kind == "b":
+            term = self._blanks.get(term_id)
+            if term is None:
+                term = self._blanks[term_id] = BlankNode()
+                self._blank_ids[term] = term_id
+            return term
+        return None
+
+    def committed(self):
+        """Keep the blank nodes stored since the last commit or rollback."""
+        self._uncommitted.clear()
+
+    def rolled_back(self):
+        """Forget the blank nodes stored since the last commit or rollback."""
+        for term in self._uncommitted:
+            del self._blanks[self._blank_ids.pop(term)]
+        self._uncommitted.clear()
+
+
+class _SQLiteStore:
+    """Shared implementation of `SQLiteGraph` and `SQLiteDataset`. Queries
+    are run against the quads table, restricted to the graph ID `_g` if it is
+    not None."""
+
+    _g = None
+
+    def _open(self, path_or_connection):
+        if isinstance(path_or_connection, sqlite3.Connection):
+            self._db = path_or_connection
+        else:
+            self._db = sqlite3.connect(path_or_connection)
+        self._db.executescript(_SCHEMA)
+        self._terms = _SQLiteTerms(self._db)
+
+    def close(self):
+        """Commits any outstanding changes and closes the database."""
+        self._db.commit()
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Run a block in a database transaction, which is committed if the
+        block finishes and rolled back, with the blank nodes it stored, if it
+        raises."""
+        try:
+            with self._db:
+                yield
+        except BaseException:
+            self._terms.rolled_back()
+            raise
+        self._terms.committed()
+
+    def _where(self, subject, predicate, object, graph=None):
+        """Build the WHERE clause and parameters for a pattern of terms, or
+        return None if the pattern names a term that is not stored."""
+        clauses = []
+        params = []
+        if self._g is not None:
+            clauses.append("q.g = ?")
+            params.append(self._g)
+        for column, term in (
+            ("s", subject),
+            ("p", predicate),
+            ("o", object),
+            ("g", graph),
+        ):
+            if term is not None:
+                term_id = self._terms.lookup(term)
+                if term_id is None:
+                    return None
+                clauses.append(f"q.{column} = ?")
+                params.append(term_id)
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _select(self, columns, where, params):
+        """Yield the rows of the quads matching where, with the given columns
+        of each decoded to a term. The rows are read from the cursor as they
+        are iterated over. A graph of `_DEFAULT_GRAPH` has no term, and is
+        decoded to None."""
+        decode = self._terms.decode
+        sql = "SELECT {} FROM quads q {}{}".format(
+            ", ".join(_term_columns(column) for column in columns),
+            " ".join(
+                f"{'LEFT JOIN' if column == 'g' else 'JOIN'} terms {column} "
+                f"ON {column}.id = q.{column}"
+                for column in columns
+            ),
+            where,
+        )
+        for row in self._db.execute(sql, params):
+            yield tuple(decode(*row[i : i + 5]) for i in range(0, len(row), 5))
+
+    def _count(self, where, params):
+        return self._db.execute(
+            "SELECT COUNT(*) FROM quads q" + where, params
+        ).fetchone()[0]
+
+    def _insert(self, rows):
+        """Insert rows of (g, s, p, o) in batches, in a single transaction."""
+        with self._transaction():
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= _BATCH_SIZE:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)", batch
+                    )
+                    batch = []
+            self._db.executemany(
+                "INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)", batch
+            )
+
+    def _delete(self, row, item):
+        with self._db:
+            deleted = self._db.execute(
+                "DELETE FROM quads WHERE g = ? AND s = ? AND p = ? AND o = ?", row
+            ).rowcount
+        if not deleted:
+            raise KeyError(item)
+
+    def _distinct(self, column):
+        where, params = self._where(None, None, None)
+        decode = self._terms.decode
+        for row in self._db.execute(
+            f"SELECT {_term_columns('t')} FROM terms t WHERE t.id IN "
+            f"(SELECT DISTINCT q.{column} FROM quads q{where})",
+            params,
+        ):
+            yield decode(*row)
+
+    def predicate_counts(self):
+        """Returns a dictionary of the number of triples using each
+        predicate."""
+        where, params = self._where(None, None, None)
+        decode = self._terms.decode
+        return {
+            decode(*row[:5]): row[5]
+            for row in self._db.execute(
+                f"SELECT {_term_columns('t')}, c FROM terms t JOIN "
+                f"(SELECT q.p, COUNT(*) AS c FROM quads q{where} GROUP BY q.p) "
+                "ON t.id = p",
+                params,
+            )
+        }
+
+    def transaction(self):
+        """Returns a :py:class:`~pymantic.primitives.Transaction` which buffers
+        changes and applies them together."""
+        return Transaction(self)
+
+    def toArray(self):
+        return frozenset(self)
+
+
+class SQLiteGraph(_SQLiteStore):
+    """A `SQLiteGraph` holds a set of `Triple` in an SQLite database, with the
+    same API as :py:class:`~pymantic.primitives.Graph`.
+
+    Terms are stored once each in a table of terms, and triples as rows of
+    term IDs with covering indexes in SPO, POS and OSP order. `match` reads
+    its results from a database cursor as they are iterated over, so large
+    results are never held in memory. `addAll` inserts in batches in a
+    single database transaction; `add` and `remove` commit immediately.
+
+    path_or_connection is a file name, ":memory:", or an open
+    `sqlite3.Connection`. graph_uri, if given, names the graph, and a single
+    database can hold several graphs with different names."""
+
+    def __init__(self, path_or_connection=":memory:", graph_uri=None):
+        self._open(path_or_connection)
+        self._set_uri(graph_uri)
+
+    def _set_uri(self, graph_uri):
+        if graph_uri is None:
+            self._g = _DEFAULT_GRAPH
+        else:
+            with self._db:
+                self._g = self._terms.intern(graph_uri)
+        if graph_uri is not None and not isinstance(graph_uri, NamedNode):
+            graph_uri = NamedNode(graph_uri)
+        self._uri = graph_uri
+
+    @property
+    def uri(self):
+        """URI name of the graph, if it has been given a name"""
+        return self._uri
+
+    def _row(self, triple, intern):
+        return (self._g, intern(triple[0]), intern(triple[1]), intern(triple[2]))
+
+    def add(self, triple):
+        """Adds the specified Triple to the graph. This method returns the
+        graph instance it was called on."""
+        with self._transaction():
+            self._insert((self._row(triple, self._terms.intern),))
+        return self
+
+    def remove(self, triple):
+        """Removes the specified Triple from the graph. This method returns the
+        graph instance it was called on."""
+        row = self._row(triple, self._terms.lookup)
+        if None in row:
+            raise KeyError(triple)
+        self._delete(row, triple)
+        return self
+
+    def addAll(self, graph_or_triples):
+        """Imports the graph or set of triples in to this graph, in batches
+        inside a single database transaction. This method returns the graph
+        instance it was called on."""
+        ids = {}
+        intern = self._terms.intern
+
+        def cached_intern(term):
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = intern(term)
+            return term_id
+
+        self._insert(self._row(triple, cached_intern) for triple in graph_or_triples)
+        return self
+
+    def match(self, subject=None, predicate=None, object=None):
+        """Returns an iterator over the triples in the graph matching the
+        given subject, predicate and object; arguments that are None match
+        anything. See :py:meth:`pymantic.primitives.Graph.match`."""
+        where = self._where(subject, predicate, object)
+        if where is None:
+            return iter(())
+        return (Triple(*row) for row in self._select("spo", *where))
+
+    def count(self, subject=None, predicate=None, object=None):
+        """Returns the number of triples :py:meth:`match` would return for the
+        same arguments, counted by the database."""
+        where = self._where(subject, predicate, object)
+        if where is None:
+            return 0
+        return self._count(*where)
+
+    def removeMatches(self, subject, predicate, object):
+        """This method removes those triples in the current graph which match
+        the given arguments."""
+        for triple in list(self.match(subject, predicate, object)):
+            self.remove(triple)
+        return self
+
+    def __contains__(self, item):
+        return self.count(*item) > 0
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self.match()
+
+    def subjects(self):
+        """Returns an iterator over subjects in the graph."""
+        return self._distinct("s")
+
+    def predicates(self):
+        """Returns an iterator over predicates in the graph."""
+        return self._distinct("p")
+
+    def objects(self):
+        """Returns an iterator over objects in the graph."""
+        return self._distinct("o")
+
+
+class SQLiteDataset(_SQLiteStore):
+    """A `SQLiteDataset` holds a set of named graphs in an SQLite database,
+    with the same API as :py:class:`~pymantic.primitives.Dataset`. As well as
+    the indexes of `SQLiteGraph`, it keeps SPOG, POSG and OSPG indexes for
+    patterns that don't name a graph.
+
+    Its graphs are `SQLiteGraph` objects sharing its database connection.
+    Quads with a graph of None are stored as the triples of an unnamed
+    `SQLiteGraph` in the same database, and the triples of an unnamed
+    `SQLiteGraph` are read back as quads with a graph of None."""
+
+    def __init__(self, path_or_connection=":memory:"):
+        self._open(path_or_connection)
+        self._db.executescript(_DATASET_SCHEMA)
+
+    def _graph(self, graph_name):
+        graph = SQLiteGraph.__new__(SQLiteGraph)
+        graph._db = self._db
+        graph._terms = self._terms
+        graph._set_uri(graph_name)
+        return graph
+
+    def _row(self, quad, intern):
+        graph = _DEFAULT_GRAPH if quad[3] is None else intern(quad[3])
+        return (graph, intern(quad[0]), intern(quad[1]), intern(quad[2]))
+
+    def add(self, quad):
+        with self._transaction():
+            self._insert((self._row(quad, self._terms.intern),))
+
+    def remove(self, quad):
+        row = self._row(quad, self._terms.lookup)
+        if None in row:
+            raise KeyError(quad)
+        self._delete(row, quad)
+
+    def add_graph(self, graph, named=None):
+        name = named or graph.uri
+        if name:
+            self.remove_graph(name)
+            self._graph(name).addAll(graph)
+        else:
+            raise ValueError("Graph must be named")
+
+    def remove_graph(self, graph_or_uri):
+        """Removes a graph, given either the graph or its name, from the
+        dataset."""
+        name = getattr(graph_or_uri, "uri", graph_or_uri)
+        graph_id = self._terms.lookup(name)
+        if graph_id is not None:
+            with self._db:
+                self._db.execute("DELETE FROM quads WHERE g = ?", (graph_id,))
+
+    @property
+    def graphs(self):
+        graphs = [self._graph(graph_name) for graph_name in self._distinct("g")]
+        if self._db.execute(
+            "SELECT 1 FROM quads WHERE g = ? LIMIT 1", (_DEFAULT_GRAPH,)
+        ).fetchone():
+            graphs.append(self._graph(None))
+        return graphs
+
+    def match(self, subject=None, predicate=None, object=None, graph=None):
+        where = self._where(subject, predicate, object, graph or None)
+        if where is None:
+            return iter(())
+        return (Quad(*row) for row in self._select("spog", *where))
+
+    def count(self, subject=None, predicate=None, object=None, graph=None):
+        """Returns the number of quads :py:meth:`match` would return for the
+        same arguments, counted by the database."""
+        where = self._where(subject, predicate, object, graph or None)
+        if where is None:
+            return 0
+        return self._count(*where)
+
+    def removeMatches(self, subject=None, predicate=None, object=None, graph=None):
+        """This method removes those quads in the dataset which match the
+        given arguments."""
+        for quad in list(self.match(subject, predicate, object, graph)):
+            self.remove(quad)
+        return self
+
+    def addAll(self, dataset_or_quads):
+        """Imports the dataset or set of quads in to this dataset, in batches
+        inside a single database transaction. This method returns the dataset
+        instance it was called on."""
+        ids = {}
+        intern = self._terms.intern
+
+        def cached_intern(term):
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = intern(term)
+            return term_id
+
+        self._insert(self._row(quad, cached_intern) for quad in dataset_or_quads)
+        return self
+
+    def __len__(self):
+        return self.count()
+
+    def __contains__(self, item):
+        if hasattr(item, "graph"):
+            # A graph of None is the default graph here, not any graph.
+            row = self._row(item, self._terms.lookup)
+            return None not in row and (
+                self._db.execute(
+                    "SELECT 1 FROM quads WHERE g = ? AND s = ? AND p = ? AND o = ?",
+                    row,
+                ).fetchone()
+                is not None
+            )
+        return self.count(item[0], item[1], item[2]) > 0
+
+    def __iter__(self):
+        return self.match()
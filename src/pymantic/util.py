@@ -2,7 +2,10 @@
 
 __all__ = ["en", "de", "one_or_none", "normalize_iri", "quote_normalized_iri"]
 
+from contextlib import contextmanager
+import gc
 import re
+import threading
 from urllib.parse import quote
 
 
@@ -79,16 +82,55 @@ def percent_encode(char):
     return "".join("%%%02X" % char for char in char.encode("utf-8"))
 
 
+# IRIs made only of characters quote_normalized_iri leaves alone.
+unquoted_iri_re = re.compile(
+    r"[A-Za-z0-9_.~\-" + re.escape("".join(reserved_in_iri)) + "]*"
+)
+
+
 def quote_normalized_iri(normalized_iri):
     """Percent-encode a normalized IRI; IE, all reserved characters are presumed
     to be themselves and not percent encoded. All other unsafe characters are
     percent-encoded."""
+    if unquoted_iri_re.fullmatch(normalized_iri):
+        return normalized_iri
     normalized_uri = "".join(
         percent_encode(char) if ord(char) > 127 else char for char in normalized_iri
     )
     return quote(normalized_uri, safe="".join(reserved_in_iri))
 
 
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def paused_gc():
+    """Pause cyclic garbage collection for the duration of a bulk insert.
+
+    Loading creates many small dictionaries and tuples, none of them garbage,
+    which would otherwise trigger repeated (and increasingly slow) collections
+    of the older generations.
+
+    Collection is switched off for the whole process, so pauses are counted:
+    nested pauses, or pauses in several threads, switch it back on only when
+    the last of them ends, and only if it was on before the first began."""
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+
 def smart_urljoin(base, url):
     """urljoin, only an empty fragment from the relative(?) URL will be
     preserved.
@@ -0,0 +1,88 @@
+import bz2
+import gzip
+import io
+import lzma
+import pytest
+
+from pymantic.compression import open_input, open_output, sniff_compression
+from pymantic.parsers import ntriples_parser, turtle_parser
+import pymantic.parsers.lark as lark_parsers
+from pymantic.primitives import Graph
+from pymantic.serializers import serialize_ntriples, serialize_turtle
+
+from .test_primitives import generate_triples
+
+compressions = [
+    ("gzip", ".gz", gzip.decompress),
+    ("bz2", ".bz2", bz2.decompress),
+    ("xz", ".xz", lzma.decompress),
+]
+
+
+def graph():
+    return Graph("http://example.com/graph").addAll(generate_triples(200))
+
+
+@pytest.mark.parametrize(["compression", "extension", "decompress"], compressions)
+def test_path_round_trip(tmp_path, compression, extension, decompress):
+    g = graph()
+    path = tmp_path / ("graph.nt" + extension)
+    serialize_ntriples(g, path)
+    data = path.read_bytes()
+    assert sniff_compression(data) == compression
+    assert decompress(data).decode("utf-8").count("\n") == len(g)
+    for parser in (ntriples_parser, lark_parsers.ntriples_parser):
+        assert set(parser.parse(path)) == set(g)
+
+
+@pytest.mark.parametrize(["compression", "extension", "decompress"], compressions)
+def test_stream_round_trip(compression, extension, decompress):
+    g = graph()
+    f = io.BytesIO()
+    serialize_ntriples(g, f, compression=compression)
+    assert not f.closed
+    f.seek(0)
+    assert set(ntriples_parser.parse(f)) == set(g)
+    assert not f.closed
+    for parser in (ntriples_parser, lark_parsers.ntriples_parser):
+        assert set(parser.iter_triples(f.getvalue())) == set(g)
+
+
+def test_uncompressed_binary_stream():
+    g = graph()
+    f = io.BytesIO()
+    serialize_ntriples(g, f)
+    assert sniff_compression(f.getvalue()) is None
+    f.seek(0)
+    assert set(ntriples_parser.parse(f)) == set(g)
+
+
+def test_parse_parallel(tmp_path):
+    g = graph()
+    path = tmp_path / "graph.nt.gz"
+    serialize_ntriples(g, path)
+    assert set(ntriples_parser.parse_parallel(str(path), workers=1)) == set(g)
+
+
+def test_turtle(tmp_path):
+    g = Graph().addAll(
+        t for t in generate_triples(200) if t.subject.interfaceName == "NamedNode"
+    )
+    path = tmp_path / "graph.ttl.bz2"
+    serialize_turtle(g, path)
+    assert set(turtle_parser.parse(path)) == set(g)
+    assert set(turtle_parser.iter_triples(path.read_bytes())) == set(g)
+
+
+def test_text_passes_through():
+    text = io.StringIO()
+    with open_output(text, "gzip") as f:
+        assert f is text
+    with open_input(text) as f:
+        assert f is text
+
+
+def test_line_endings_kept():
+    data = gzip.compress(b"a\r\nb\rc\n")
+    with open_input(io.BytesIO(data)) as f:
+        assert f.read() == "a\r\nb\rc\n"
@@ -0,0 +1,70 @@
+import pytest
+
+from pymantic.mapped import MappedGraph, serialize_mapped
+from pymantic.primitives import BlankNode, Graph, Literal, NamedNode, Triple
+
+from .test_primitives import all_patterns, generate_triples
+
+
+def write(tmp_path, graph):
+    path = tmp_path / "graph.bin"
+    with open(path, "wb") as f:
+        serialize_mapped(graph, f)
+    return str(path)
+
+
+def test_mapped_graph_matches_graph(tmp_path):
+    triples = list(generate_triples(1000))
+    plain = Graph().addAll(triples)
+    mapped = MappedGraph(write(tmp_path, plain))
+    assert len(mapped) == len(plain)
+    assert set(mapped) == set(plain)
+    for t in triples[:50]:
+        assert t in mapped
+        for pattern in all_patterns(t):
+            assert set(mapped.match(*pattern)) == set(plain.match(*pattern))
+            assert mapped.count(*pattern) == plain.count(*pattern)
+    assert set(mapped.subjects()) == set(plain.subjects())
+    assert set(mapped.predicates()) == set(plain.predicates())
+    assert set(mapped.objects()) == set(plain.objects())
+    assert mapped.predicate_counts() == plain.predicate_counts()
+    missing = NamedNode("http://example.com/missing")
+    assert list(mapped.match(missing, None, None)) == []
+    mapped.close()
+
+
+def test_mapped_graph_terms(tmp_path):
+    s = NamedNode("http://example.com/é")
+    p = NamedNode("http://purl.org/dc/terms/title")
+    bnode = BlankNode()
+    triples = [
+        Triple(s, p, Literal("Never!", "en")),
+        Triple(s, p, Literal("nul\x00byte")),
+        Triple(s, p, Literal(42)),
+        Triple(s, p, bnode),
+        Triple(bnode, p, Literal("blank")),
+    ]
+    mapped = MappedGraph(write(tmp_path, Graph().addAll(triples)))
+    assert set(mapped) >= set(triples[:3])
+    (node,) = [t.object for t in mapped.match(s, p, None) if t not in triples]
+    assert isinstance(node, BlankNode)
+    assert list(mapped.match(node, None, None)) == [Triple(node, p, Literal("blank"))]
+    mapped.close()
+
+
+def test_mapped_graph_is_read_only(tmp_path):
+    t = next(generate_triples(2))
+    mapped = MappedGraph(write(tmp_path, Graph().add(t)))
+    with pytest.raises(TypeError):
+        mapped.add(t)
+    with pytest.raises(TypeError):
+        mapped.remove(t)
+    assert list(mapped) == [t]
+    mapped.close()
+
+
+def test_mapped_graph_bad_file(tmp_path):
+    path = tmp_path / "graph.bin"
+    path.write_bytes(b"not a graph" * 10)
+    with pytest.raises(ValueError):
+        MappedGraph(str(path))
@@ -1,4 +1,9 @@
+import glob
 from io import StringIO
+from itertools import count, islice
+from lark.exceptions import LarkError
+import os.path
+import pytest
 
 from pymantic.parsers import (
     jsonld_parser,
@@ -6,7 +11,18 @@ from pymantic.parsers import (
     ntriples_parser,
     turtle_parser,
 )
-from pymantic.primitives import Graph, Literal, NamedNode, Quad, Triple
+import pymantic.parsers.lark as lark_parsers
+from pymantic.primitives import (
+    BlankNode,
+    Dataset,
+    Graph,
+    Literal,
+    NamedNode,
+    Quad,
+    Triple,
+)
+
+from .test_turtle import isomorph
 
 
 def test_parse_ntriples_named_nodes():
@@ -182,6 +198,205 @@ def test_parse_nquads_named_nodes():
     )
 
 
+@pytest.mark.parametrize(
+    "path",
+    sorted(glob.glob(os.path.join(os.path.dirname(__file__), "TurtleTests", "*.nt"))),
+)
+def test_ntriples_parser_matches_lark(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    fast = ntriples_parser.parse_string(data)
+    strict = lark_parsers.ntriples_parser.parse_string(data)
+    assert len(fast) == len(strict)
+    assert isomorph(fast) == isomorph(strict)
+
+
+def test_parse_ntriples_comments_and_shared_bnodes():
+    test_ntriples = """# A comment
+<http://example.com/objects/1> <http://example.com/predicates/1> _:A1 . # trailing
+
+_:A1 <http://example.com/predicates/2> "caf\\u00E9"@fr .
+"""
+    g = ntriples_parser.parse(test_ntriples)
+    assert len(g) == 2
+    (bnode,) = [t.subject for t in g if isinstance(t.subject, BlankNode)]
+    assert (
+        Triple(
+            NamedNode("http://example.com/objects/1"),
+            NamedNode("http://example.com/predicates/1"),
+            bnode,
+        )
+        in g
+    )
+    assert Literal("café", language="fr") in set(g.objects())
+
+
+def test_parse_ntriples_syntax_error():
+    with pytest.raises(LarkError):
+        ntriples_parser.parse("<http://example.com/objects/1> oops .\n")
+
+
+def test_parse_nquads_blank_graph():
+    test_nquads = """<http://example.com/objects/1> <http://example.com/predicates/1> "1" _:g .
+<http://example.com/objects/2> <http://example.com/predicates/1> "2" _:g .
+"""
+    g = nquads_parser.parse(test_nquads)
+    assert len({q.graph for q in g}) == 1
+    assert isinstance(next(iter(g)).graph, BlankNode)
+
+
+def test_parse_nquads_default_graph():
+    test_nquads = """<http://example.com/objects/1> <http://example.com/predicates/1> "1" .
+<http://example.com/objects/2> <http://example.com/predicates/1> "2" <http://example.com/g> .
+"""
+    for parser in (nquads_parser, lark_parsers.nquads_parser):
+        graphs = {q.object.value: q.graph for q in parser.parse(test_nquads)}
+        assert graphs == {"1": None, "2": NamedNode("http://example.com/g")}
+
+
+def test_parse_nquads_parallel(tmp_path):
+    lines = []
+    for i in range(300):
+        lines.append(
+            f"<http://example.com/s{i}> <http://example.com/p> _:b{i % 7} "
+            f"<http://example.com/g{i % 3}> .\n"
+        )
+        lines.append(f'_:b{i % 7} <http://example.com/p> "{i}" _:g .\n')
+    path = tmp_path / "data.nq"
+    path.write_text("".join(lines))
+    serial = nquads_parser.parse(StringIO("".join(lines)), Dataset())
+    parallel = nquads_parser.parse_parallel(
+        str(path), Dataset(), workers=2, chunk_size=500
+    )
+    assert len(parallel) == len(serial) == 600
+    assert len({q.object for q in parallel if isinstance(q.object, BlankNode)}) == 7
+    assert len({q.subject for q in parallel if isinstance(q.subject, BlankNode)}) == 7
+    assert len({q.graph for q in parallel}) == 4
+    assert {
+        q.object for q in parallel if q.subject == NamedNode("http://example.com/s7")
+    } == {q.subject for q in parallel.match(object=Literal("0"))}
+
+
+def test_ntriples_iter_triples_is_lazy():
+    lines = (
+        f"_:b{i % 2} <http://example.com/p> <http://example.com/o{i}> .\n"
+        for i in count()
+    )
+    triples = list(islice(ntriples_parser.iter_triples(lines), 4))
+    assert [t.object for t in triples] == [
+        NamedNode(f"http://example.com/o{i}") for i in range(4)
+    ]
+    assert triples[0].subject is triples[2].subject
+    assert triples[0].subject is not triples[1].subject
+
+
+@pytest.mark.parametrize(
+    "parser", [ntriples_parser, lark_parsers.ntriples_parser], ids=["fast", "lark"]
+)
+def test_iter_triples_separate_bnodes(parser):
+    data = "_:A1 <http://example.com/p> _:A1 .\n"
+    first = parser.iter_triples(StringIO(data * 2))
+    second = parser.iter_triples(StringIO(data))
+    a = next(first)
+    b = next(second)
+    assert a.subject is a.object and b.subject is b.object
+    assert a.subject is not b.subject
+    assert next(first).subject is a.subject
+
+
+def test_nquads_iter_quads():
+    test_nquads = """<http://example.com/objects/1> <http://example.com/predicates/1> <http://example.com/objects/2> <http://example.com/graphs/1> .
+"""
+    for parser in (nquads_parser, lark_parsers.nquads_parser):
+        assert list(parser.iter_quads(test_nquads)) == [
+            Quad(
+                NamedNode("http://example.com/objects/1"),
+                NamedNode("http://example.com/predicates/1"),
+                NamedNode("http://example.com/objects/2"),
+                NamedNode("http://example.com/graphs/1"),
+            )
+        ]
+
+
+def test_turtle_iter_triples():
+    ttl = """@prefix ex: <http://example.org/stuff/1.0/> .
+ex:a ex:b [ ex:c "d" ] ."""
+    triples = list(turtle_parser.iter_triples(StringIO(ttl)))
+    assert len(triples) == 2
+    graph = Graph()
+    graph.addAll(triples)
+    assert isomorph(graph) == isomorph(turtle_parser.parse(StringIO(ttl)))
+
+
+def test_turtle_iter_triples_is_lazy():
+    class Stream(StringIO):
+        reads = 0
+
+        def read(self, size=-1):
+            self.reads += 1
+            return super().read(size)
+
+    statement = '<http://a.example/s> <http://a.example/p> "o. [(#" .\n'
+    stream = Stream("@prefix ex: <http://a.example/> .\n" + statement * 1000)
+    triples = turtle_parser.iter_triples(stream, chunk_size=100)
+    assert next(triples).object == Literal(
+        "o. [(#", datatype=NamedNode("http://www.w3.org/2001/XMLSchema#string")
+    )
+    assert stream.reads == 1
+    assert len(list(triples)) == 999
+
+
+@pytest.mark.parametrize(
+    "literal", ['"""He said "hi. Then left."""', '"""a"b. c"""', "'''a'b. c'''"]
+)
+def test_turtle_long_string_across_chunks(literal):
+    prefix = "@prefix ex: <http://a.example/> .\n"
+    expected = turtle_parser.parse(prefix + f"ex:a ex:b {literal} .\n")
+    assert len(expected) == 1
+    # Move the literal across every offset of each chunk size.
+    for padding in range(len(literal)):
+        ttl = prefix + " " * padding + f"ex:a ex:b {literal} .\nex:c ex:d ex:e .\n"
+        for chunk_size in range(1, len(literal) + 2):
+            triples = set(turtle_parser.iter_triples(ttl, chunk_size=chunk_size))
+            assert triples == set(expected) | {
+                Triple(
+                    NamedNode("http://a.example/c"),
+                    NamedNode("http://a.example/d"),
+                    NamedNode("http://a.example/e"),
+                )
+            }
+
+
+def test_turtle_iter_triples_interleaved():
+    first = turtle_parser.iter_triples(
+        "@prefix ex: <http://a.example/> .\nex:s ex:p _:a .\nex:s ex:p _:a .\n",
+        chunk_size=10,
+    )
+    second = turtle_parser.iter_triples(
+        "@base <http://b.example/> .\n<s> <p> _:a .\n", chunk_size=10
+    )
+    a = next(first)
+    b = next(second)
+    assert a.subject == NamedNode("http://a.example/s")
+    assert b.subject == NamedNode("http://b.example/s")
+    assert a.object is not b.object
+    assert next(first).object is a.object
+
+
+def test_jsonld_iter_quads():
+    jobj = [{"@id": "http://example.com/id1", "http://example.com/term1": ["v1"]}]
+    assert list(jsonld_parser.iter_quads(jobj)) == [
+        Quad(
+            NamedNode("http://example.com/id1"),
+            NamedNode("http://example.com/term1"),
+            Literal(
+                "v1", datatype=NamedNode("http://www.w3.org/2001/XMLSchema#string")
+            ),
+            None,
+        )
+    ]
+
+
 def test_parse_turtle_example_1():
     ttl = """@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
 @prefix dc: <http://purl.org/dc/elements/1.1/> .
@@ -198,6 +413,16 @@ def test_parse_turtle_example_1():
     assert len(g) == 4
 
 
+def test_parse_turtle_object_list_of_blank_nodes():
+    ttl = """@prefix ex: <http://example.org/> .
+ex:a ex:b [ ex:c "1" ], ("2" "3"), ex:d ."""
+    g = turtle_parser.parse(ttl)
+    assert len(g) == 8
+    objects = {t.object for t in g.match(subject=NamedNode("http://example.org/a"))}
+    assert len(objects) == 3
+    assert all(isinstance(o, (BlankNode, NamedNode)) for o in objects)
+
+
 def test_jsonld_basic():
     import json
 
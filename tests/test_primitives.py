@@ -1,15 +1,30 @@
+import copy
+import gc
+import pickle
+import pytest
 import random
+import threading
+import tracemalloc
 
+from pymantic import primitives
 from pymantic.primitives import (
+    _BULK_BATCH,
     BlankNode,
+    CompactGraph,
     Dataset,
     Graph,
     Literal,
     NamedNode,
+    PrefixMap,
     Quad,
+    TermDictionary,
+    TermMap,
     Triple,
+    q_as_t,
+    t_as_q,
     to_curie,
 )
+from pymantic.util import paused_gc
 
 
 def en(s):
@@ -23,6 +38,152 @@ def test_to_curie_multi_match():
     assert curie == "long:b"
 
 
+def test_prefix_map_shrink_matches_scan():
+    prefixes = PrefixMap(
+        [
+            ("a", "http://a/"),
+            ("ab", "http://a/b"),
+            ("abc", "http://a/b/c#"),
+            ("abx", "http://a/b/x"),
+            ("dup", "http://a/b"),
+            ("b", "http://b/"),
+        ]
+    )
+    iris = [
+        "http://a/b/c#d",
+        "http://a/b/cd",
+        "http://a/b/y",
+        "http://a/c",
+        "http://a/",
+        "http://b/x",
+        "http://c/x",
+        "http:",
+    ]
+    for iri in iris:
+        assert prefixes.shrink(iri) == to_curie(iri, dict(prefixes))
+    assert prefixes.shrink("http://a/b/c#d") == "abc:d"
+    assert prefixes.shrink("http://a/b/cd") == "ab:/cd"
+    assert prefixes.shrink("http://c/x") == "http://c/x"
+    assert to_curie("http://a/b/c#d", prefixes, explicit=True) == "[abc:d]"
+
+
+def test_prefix_map_shrink_follows_changes():
+    prefixes = PrefixMap(a="http://a/")
+    assert prefixes.shrink("http://a/b/c") == "a:b/c"
+    prefixes["ab"] = "http://a/b/"
+    assert prefixes.shrink("http://a/b/c") == "ab:c"
+    prefixes.update(abc="http://a/b/c")
+    assert prefixes.shrink("http://a/b/c") == "abc:"
+    prefixes.pop("abc")
+    assert prefixes.shrink("http://a/b/c") == "ab:c"
+    prefixes.setdefault("other", "http://a/b/")
+    prefixes.move_to_end("ab")
+    assert prefixes.shrink("http://a/b/c") == "other:c"
+    del prefixes["other"]
+    prefixes.addAll({"abc": "http://a/b/c"})
+    assert prefixes.shrink("http://a/b/c") == "abc:"
+    prefixes.setDefault("http://a/b/c")
+    assert prefixes.shrink("http://a/b/c") == "abc:"
+    prefixes.clear()
+    assert prefixes.shrink("http://a/b/c") == "http://a/b/c"
+
+
+def test_term_map_shrink_follows_changes():
+    terms = TermMap(a="http://x/a", b="http://x/b")
+    assert terms.shrink("http://x/a") == "a"
+    assert terms.shrink("http://x/c") == "http://x/c"
+    terms["c"] = "http://x/c"
+    terms["alias"] = "http://x/a"
+    assert terms.shrink("http://x/c") == "c"
+    assert terms.shrink("http://x/a") == "a"
+    del terms["a"]
+    assert terms.shrink("http://x/a") == "alias"
+    # b keeps its place before alias.
+    terms["b"] = "http://x/a"
+    assert terms.shrink("http://x/a") == "b"
+    assert terms.shrink("http://x/b") == "http://x/b"
+    terms.update({"b": "http://x/b"}, d="http://x/d")
+    assert terms.shrink("http://x/a") == "alias"
+    assert terms.shrink("http://x/d") == "d"
+    terms |= {"e": "http://x/e"}
+    terms.addAll({"e": "http://x/other", "f": "http://x/f"})
+    assert terms.shrink("http://x/e") == "e"
+    assert terms.shrink("http://x/f") == "f"
+    assert terms.pop("f") == "http://x/f"
+    assert terms.pop("f", None) is None
+    assert terms.setdefault("g", "http://x/g") == "http://x/g"
+    assert terms.popitem() == ("g", "http://x/g")
+    assert terms.shrink("http://x/f") == "http://x/f"
+    assert terms.shrink("http://x/g") == "http://x/g"
+    terms.clear()
+    assert terms.shrink("http://x/b") == "http://x/b"
+    terms["b"] = "http://x/b"
+    assert terms.shrink("http://x/b") == "b"
+
+
+def test_term_map_shrink_after_deleting_shared_iri():
+    terms = TermMap()
+    for i in range(5):
+        terms[f"t{i}"] = "http://x/shared"
+    terms["other"] = "http://x/other"
+    assert terms.shrink("http://x/shared") == "t0"
+    del terms["t0"]
+    assert terms.shrink("http://x/shared") == "t1"
+    del terms["t2"]
+    assert terms.shrink("http://x/shared") == "t1"
+    # t4 keeps its place after t3 when it is changed away and back.
+    terms["t4"] = "http://x/other"
+    assert terms.shrink("http://x/other") == "t4"
+    terms["t1"] = "http://x/other"
+    assert terms.shrink("http://x/shared") == "t3"
+    assert terms.shrink("http://x/other") == "t1"
+    terms["t4"] = "http://x/shared"
+    assert terms.pop("t3") == "http://x/shared"
+    assert terms.shrink("http://x/shared") == "t4"
+    del terms["t4"]
+    assert terms.shrink("http://x/shared") == "http://x/shared"
+    assert [terms.shrink(iri) for iri in terms.values()] == [
+        next(t for t, i in terms.items() if i == iri) for iri in terms.values()
+    ]
+
+
+def test_term_map_copies_have_own_index():
+    terms = TermMap(a="http://x/a")
+    terms.setDefault("http://x/")
+    assert terms.shrink("http://x/a") == "a"
+    for other in (
+        copy.copy(terms),
+        copy.deepcopy(terms),
+        pickle.loads(pickle.dumps(terms)),
+    ):
+        assert other == terms
+        assert other.default == "http://x/"
+        other["b"] = "http://x/b"
+        assert other.shrink("http://x/b") == "b"
+        assert terms.shrink("http://x/b") == "http://x/b"
+        del other["a"]
+        assert terms.shrink("http://x/a") == "a"
+
+
+def test_to_nt_is_cached():
+    datatype = NamedNode("http://example.com/type")
+    node = NamedNode("http://example.com/caf\u00e9")
+    literal = Literal('say "hi"', datatype=datatype)
+    assert node.toNT() == "<http://example.com/caf%C3%A9>"
+    assert node.toNT() is node.toNT()
+    assert NamedNode(str(node)).toNT() is node.toNT()
+    assert literal.toNT() == '"say \\"hi\\""^^<http://example.com/type>'
+    assert literal.toNT() is literal.toNT()
+    assert Literal("hi", "en").toNT() == '"hi"@en'
+
+
+def test_to_nt_skips_cache_for_long_terms():
+    long = Literal("x" * 1000)
+    before = primitives._cached_literal_nt.cache_info().currsize
+    assert long.toNT() == '"' + "x" * 1000 + '"'
+    assert primitives._cached_literal_nt.cache_info().currsize == before
+
+
 def test_simple_add():
     t = Triple(
         NamedNode("http://example.com"),
@@ -167,9 +328,499 @@ def test_iter_10000_triples():
     assert len(triples) == 0
 
 
+def test_interned_graph():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        en("Never!"),
+    )
+    g = Graph(term_dictionary=TermDictionary())
+    g.add(t)
+    assert t in g
+    assert list(g) == [t]
+    assert list(g.match(None, None, en("Never!"))) == [t]
+    assert list(g.match(NamedNode("http://example.com"), None, None)) == [t]
+    assert list(g.subjects()) == [NamedNode("http://example.com")]
+    g.remove(t)
+    assert t not in g
+    assert len(g) == 0
+
+
+def test_interned_graph_unknown_terms():
+    g = Graph(term_dictionary=TermDictionary())
+    for t in generate_triples(100):
+        g.add(t)
+    unknown = NamedNode("http://example.com/unknown")
+    assert list(g.match(unknown, None, None)) == []
+    assert Triple(unknown, unknown, unknown) not in g
+    assert unknown not in g.term_dictionary
+    with pytest.raises(KeyError):
+        g.remove(Triple(unknown, unknown, unknown))
+
+
+def test_interned_graph_shares_terms():
+    terms = TermDictionary()
+    g1 = Graph(term_dictionary=terms)
+    g2 = Graph(term_dictionary=terms)
+    s = NamedNode("http://example.com")
+    p = NamedNode("http://purl.org/dc/terms/title")
+    g1.add(Triple(s, p, en("One")))
+    g2.add(Triple(NamedNode("http://example.com"), p, en("Two")))
+    assert len(terms) == 4
+    assert next(g2.subjects()) is s
+
+
+def test_interned_graph_matches_plain_graph():
+    triples = list(generate_triples(1000))
+    plain = Graph().addAll(triples)
+    interned = Graph(term_dictionary=TermDictionary()).addAll(triples)
+    assert set(interned) == set(plain)
+    for t in triples[:50]:
+        for pattern in (
+            (t.subject, None, None),
+            (None, t.predicate, None),
+            (None, None, t.object),
+            (t.subject, t.predicate, None),
+            (t.subject, None, t.object),
+            (None, t.predicate, t.object),
+            tuple(t),
+        ):
+            assert set(interned.match(*pattern)) == set(plain.match(*pattern))
+
+
+def test_interned_dataset_indexes_store_ids():
+    triples = list(generate_triples(200))
+    graphs = [NamedNode("http://example.com/g1"), NamedNode("http://example.com/g2")]
+    quads = [t_as_q(graphs[i % 2], t) for i, t in enumerate(triples)]
+    plain = Dataset().addAll(quads)
+    interned = Dataset(term_dictionary=TermDictionary()).addAll(quads)
+    assert all(isinstance(s, int) for s in interned._spog)
+    assert all(isinstance(p, int) for p in interned._posg)
+    assert all(isinstance(o, int) for o in interned._ospg)
+    assert set(interned.subjects()) == set(plain.subjects())
+    assert interned.predicate_counts() == plain.predicate_counts()
+    for t in triples[:50]:
+        assert t in interned
+        for pattern in (
+            (t.subject, None, None),
+            (None, t.predicate, None),
+            (None, None, t.object),
+            (t.subject, t.predicate, None),
+            (t.subject, None, t.object),
+            (None, t.predicate, t.object),
+            tuple(t),
+        ):
+            assert set(interned.match(*pattern)) == set(plain.match(*pattern))
+            assert interned.count(*pattern) == plain.count(*pattern)
+    unknown = NamedNode("http://example.com/unknown")
+    assert list(interned.match(unknown)) == []
+    assert interned.count(None, unknown) == 0
+    assert Triple(unknown, unknown, unknown) not in interned
+    for quad in quads:
+        interned.remove(quad)
+    assert not interned._spog and not interned._posg and not interned._ospg
+
+
+def test_addAll_matches_add():
+    triples = list(generate_triples(1000))
+    added = Graph()
+    for t in triples:
+        added.add(t)
+    bulk = Graph().addAll(triples + triples[:100])
+    assert len(bulk) == len(added)
+    assert set(bulk) == set(added)
+    for t in triples[:50]:
+        for pattern in all_patterns(t):
+            assert set(bulk.match(*pattern)) == set(added.match(*pattern))
+
+
+def test_addAll_restores_gc():
+    Graph().addAll(generate_triples(10))
+    assert gc.isenabled()
+    with pytest.raises(TypeError):
+        Graph().addAll([None])
+    assert gc.isenabled()
+
+
+def test_addAll_collects_while_consuming_source():
+    seen = []
+
+    def source():
+        for triple in generate_triples(3):
+            seen.append(gc.isenabled())
+            yield triple
+
+    Graph().addAll(source())
+    CompactGraph().addAll(source())
+    assert all(seen)
+
+
+def test_paused_gc_nests():
+    with paused_gc():
+        with paused_gc():
+            assert not gc.isenabled()
+        assert not gc.isenabled()
+    assert gc.isenabled()
+
+
+def all_patterns(t):
+    return (
+        (None, None, None),
+        (t.subject, None, None),
+        (None, t.predicate, None),
+        (None, None, t.object),
+        (t.subject, t.predicate, None),
+        (t.subject, None, t.object),
+        (None, t.predicate, t.object),
+        tuple(t),
+    )
+
+
+def test_compact_graph_matches_graph():
+    triples = list(generate_triples(1000))
+    plain = Graph().addAll(triples)
+    compact = CompactGraph().addAll(triples)
+    assert len(compact) == len(plain)
+    assert set(compact) == set(plain)
+    for t in triples[:50]:
+        assert t in compact
+        for pattern in all_patterns(t):
+            assert set(compact.match(*pattern)) == set(plain.match(*pattern))
+    assert set(compact.subjects()) == set(plain.subjects())
+    assert set(compact.predicates()) == set(plain.predicates())
+    assert set(compact.objects()) == set(plain.objects())
+
+
+def test_compact_graph_write_buffer():
+    triples = list(set(generate_triples(500)))
+    compact = CompactGraph(buffer_size=64)
+    plain = Graph()
+    for t in triples:
+        compact.add(t)
+        plain.add(t)
+    for t in triples[::3]:
+        compact.remove(t)
+        plain.remove(t)
+    compact.add(triples[0])
+    plain.add(triples[0])
+    assert len(compact._added) + len(compact._removed) < 64
+    assert len(compact) == len(plain)
+    assert set(compact) == set(plain)
+    for t in triples[:30]:
+        assert (t in compact) == (t in plain)
+        for pattern in all_patterns(t):
+            assert set(compact.match(*pattern)) == set(plain.match(*pattern))
+    compact.flush()
+    assert not compact._added and not compact._removed
+    assert set(compact) == set(plain)
+
+
+def test_compact_graph_flushes_in_runs():
+    triples = list(set(generate_triples(2000)))
+    compact = CompactGraph(buffer_size=16)
+    plain = Graph()
+    for t in triples:
+        compact.add(t)
+        plain.add(t)
+    # Runs are merged geometrically rather than in to one array per flush.
+    assert 1 < len(compact._runs) <= 2 * (len(triples) // 16).bit_length()
+    assert set(compact) == set(plain)
+    for t in triples[::7]:
+        compact.remove(t)
+        plain.remove(t)
+    compact.flush()
+    assert len(compact) == len(plain)
+    for t in triples[:30]:
+        assert (t in compact) == (t in plain)
+        for pattern in all_patterns(t):
+            assert set(compact.match(*pattern)) == set(plain.match(*pattern))
+            assert compact.count(*pattern) == plain.count(*pattern)
+    assert set(compact.subjects()) == set(plain.subjects())
+    assert len(compact._runs) == 1
+
+
+def test_compact_graph_remove_missing():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        en("Never!"),
+    )
+    compact = CompactGraph()
+    with pytest.raises(KeyError):
+        compact.remove(t)
+    compact.add(t).flush().remove(t)
+    assert t not in compact
+    with pytest.raises(KeyError):
+        compact.remove(t)
+    assert len(compact) == 0
+
+
+def test_remove_prunes_indexes():
+    triples = list(set(generate_triples(100)))
+    g = Graph().addAll(triples)
+    for t in triples:
+        g.remove(t)
+    assert not g._spo and not g._pos and not g._osp
+    assert list(g.subjects()) == []
+    assert list(g.predicates()) == []
+    assert list(g.objects()) == []
+
+
+def test_match_does_not_create_entries():
+    g = Graph().addAll(generate_triples(10))
+    subjects = set(g.subjects())
+    missing = NamedNode("http://example.com/missing")
+    for pattern in all_patterns(Triple(missing, missing, missing))[1:]:
+        assert list(g.match(*pattern)) == []
+        assert g.count(*pattern) == 0
+    assert set(g.subjects()) == subjects
+    assert missing not in set(g.predicates()) | set(g.objects())
+
+
+def test_remove_matches_prunes():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        en("Never!"),
+    )
+    g = Graph().addAll([t, t._replace(object=en("Always!"))])
+    g.removeMatches(t.subject, None, None)
+    assert len(g) == 0
+    assert not g._spo and not g._pos and not g._osp
+
+
+def test_churn_memory_is_reclaimed():
+    g = Graph()
+    tracemalloc.start()
+    try:
+        for round in range(20):
+            triples = list(set(generate_triples(500)))
+            g.addAll(triples)
+            for t in triples:
+                g.remove(t)
+            del triples
+            gc.collect()
+            if round == 1:
+                baseline = tracemalloc.get_traced_memory()[0]
+        churned = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(g) == 0
+    assert not g._spo and not g._pos and not g._osp
+    assert not g._predicate_counts
+    assert churned - baseline < 64 * 1024
+
+
+@pytest.mark.parametrize("make_graph", [Graph, CompactGraph])
+def test_transaction(make_graph):
+    triples = list(set(generate_triples(300)))
+    g = make_graph().addAll(triples[:200])
+    with g.transaction() as tx:
+        for t in triples[:50]:
+            tx.remove(t)
+        tx.addAll(triples[200:])
+        tx.add(triples[0])
+        tx.remove(triples[250])
+        tx.add(triples[100])
+        assert triples[0] in tx and triples[1] not in tx
+        assert len(g) == 200
+        with pytest.raises(KeyError):
+            tx.remove(triples[1])
+    assert tx.removed == set(triples[1:50])
+    assert tx.added == set(triples[200:]) - {triples[250]}
+    assert set(g) == (set(triples[:200]) - tx.removed) | tx.added
+
+
+def test_transaction_rollback():
+    triples = list(set(generate_triples(100)))
+    g = Graph().addAll(triples[:50])
+    with pytest.raises(RuntimeError):
+        with g.transaction() as tx:
+            tx.removeMatches(None, None, None)
+            tx.addAll(triples[50:])
+            raise RuntimeError()
+    assert set(g) == set(triples[:50])
+    assert not tx.added and not tx.removed
+    with pytest.raises(ValueError):
+        tx.add(triples[0])
+
+
+@pytest.mark.parametrize("make_graph", [Graph, CompactGraph])
+def test_transaction_conflicting_commit(make_graph):
+    triples = list(set(generate_triples(100)))
+    g = make_graph().addAll(triples[:50])
+    tx = g.transaction()
+    tx.removeMatches(None, None, None)
+    tx.addAll(triples[50:])
+    g.remove(triples[25])
+    with pytest.raises(KeyError):
+        tx.commit()
+    assert set(g) == set(triples[:50]) - {triples[25]}
+    tx.rollback()
+    assert set(g) == set(triples[:50]) - {triples[25]}
+
+
+def test_transaction_remove_matches():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        en("Never!"),
+    )
+    other = t._replace(object=en("Always!"))
+    g = Graph().add(t)
+    with g.transaction() as tx:
+        tx.add(other)
+        tx.add(t._replace(subject=NamedNode("http://example.com/other")))
+        tx.removeMatches(t.subject, None, None)
+    assert tx.removed == {t}
+    assert tx.added == {t._replace(subject=NamedNode("http://example.com/other"))}
+    assert list(g) == list(tx.added)
+
+
+@pytest.mark.parametrize(
+    "make_graph", [Graph, lambda: Graph(term_dictionary=TermDictionary())]
+)
+def test_snapshot_is_isolated(make_graph):
+    triples = list(set(generate_triples(500)))
+    g = make_graph().addAll(triples[:400])
+    snapshot = g.snapshot()
+    expected = Graph().addAll(triples[:400])
+    for t in triples[:100]:
+        g.remove(t)
+    g.addAll(triples[400:])
+    g.add(triples[0])
+    assert len(snapshot) == len(expected)
+    assert set(snapshot) == set(expected)
+    assert set(g) == set(triples[100:]) | {triples[0]}
+    for t in triples[:50] + triples[450:]:
+        assert (t in snapshot) == (t in expected)
+        for pattern in all_patterns(t):
+            assert set(snapshot.match(*pattern)) == set(expected.match(*pattern))
+            assert snapshot.count(*pattern) == expected.count(*pattern)
+    assert snapshot.predicate_counts() == expected.predicate_counts()
+    assert set(snapshot.subjects()) == set(expected.subjects())
+
+
+def test_snapshot_chain():
+    triples = list(set(generate_triples(200)))
+    g = Graph()
+    snapshots = []
+    for chunk in range(4):
+        g.addAll(triples[chunk * 50 : (chunk + 1) * 50])
+        g.remove(triples[chunk * 50])
+        snapshots.append(g.snapshot())
+    for chunk, snapshot in enumerate(snapshots):
+        removed = set(triples[: chunk * 50 + 1 : 50])
+        assert set(snapshot) == set(triples[: (chunk + 1) * 50]) - removed
+
+
+def test_snapshot_release():
+    triples = list(set(generate_triples(300)))
+    g = Graph().addAll(triples[:100])
+    snapshot = g.snapshot()
+    for t in triples[100:]:
+        g.add(t)
+    for t in triples[50:]:
+        g.remove(t)
+    assert set(snapshot) == set(triples[:100])
+    # Only nodes still in the graph are held as owned.
+    nodes = [g._triples, g._spo, g._pos, g._osp, g._predicate_counts]
+    for index in (g._spo, g._pos, g._osp):
+        for by_b in index.values():
+            nodes.append(by_b)
+            nodes.extend(by_b.values())
+    assert set(g._owned) <= set(map(id, nodes))
+    del snapshot
+    g.remove(triples[0])
+    assert g._owned is None
+    g.add(triples[0])
+    assert set(g) == set(triples[:50])
+
+
+def test_snapshot_is_read_only():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        en("Never!"),
+    )
+    snapshot = Graph().add(t).snapshot()
+    for method, args in (
+        (snapshot.add, (t,)),
+        (snapshot.remove, (t,)),
+        (snapshot.addAll, ([t],)),
+        (snapshot.removeMatches, (None, None, None)),
+    ):
+        with pytest.raises(TypeError):
+            method(*args)
+    assert list(snapshot) == [t]
+    assert snapshot.snapshot() is snapshot
+
+
+def test_snapshot_concurrent_readers():
+    triples = list(set(generate_triples(2000)))
+    g = Graph().addAll(triples[:1000])
+    snapshot = g.snapshot()
+    errors = []
+
+    def read():
+        try:
+            for _ in range(20):
+                assert len(list(snapshot)) == 1000
+                for t in triples[:20]:
+                    list(snapshot.match(t.subject, None, None))
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for t in triples[1000:]:
+        g.add(t)
+    for t in triples[:500]:
+        g.remove(t)
+    for reader in readers:
+        reader.join()
+    assert errors == []
+    assert len(g) == len(triples) - 500
+
+
+@pytest.mark.parametrize(
+    "make_graph",
+    [Graph, lambda: Graph(term_dictionary=TermDictionary()), CompactGraph],
+)
+def test_count(make_graph):
+    triples = list(generate_triples(1000))
+    g = make_graph().addAll(triples)
+    for t in triples[::5]:
+        g.remove(t)
+    missing = NamedNode("http://example.com/missing")
+    assert g.count() == len(g)
+    assert g.count(missing) == 0
+    for t in triples[:50]:
+        for pattern in all_patterns(t):
+            assert g.count(*pattern) == len(list(g.match(*pattern)))
+    expected = {}
+    for t in g:
+        expected[t.predicate] = expected.get(t.predicate, 0) + 1
+    assert g.predicate_counts() == expected
+
+
 # Dataset Tests
 
 
+def test_quad_str_is_nquads():
+    s = NamedNode("http://example.com/s")
+    p = NamedNode("http://example.com/p")
+    g = NamedNode("http://example.com/g")
+    assert str(Quad(s, p, en("hi"), g)) == (
+        '<http://example.com/s> <http://example.com/p> "hi"@en '
+        "<http://example.com/g> .\n"
+    )
+    assert str(Quad(s, p, en("hi"), None)) == (
+        '<http://example.com/s> <http://example.com/p> "hi"@en .\n'
+    )
+
+
 def test_add_quad():
     q = Quad(
         NamedNode("http://example.com/graph"),
@@ -242,6 +893,24 @@ def test_add_graph():
     assert t in ds
 
 
+@pytest.mark.parametrize("make_graph", [Graph, CompactGraph])
+def test_addAll_notifies_when_source_fails(make_graph):
+    # More than one batch, so part of the source is added before it fails.
+    triples = list(generate_triples(_BULK_BATCH + 10))
+
+    def source():
+        yield from triples
+        raise ValueError("source failed")
+
+    g = make_graph("http://example.com/graph")
+    ds = Dataset()
+    ds.add_graph(g)
+    with pytest.raises(ValueError):
+        g.addAll(source())
+    assert set(g) == set(triples[:_BULK_BATCH])
+    assert set(map(q_as_t, ds)) == set(g)
+
+
 def generate_quads(n):
     for i in range(n):
         yield Quad(
@@ -252,6 +921,108 @@ def generate_quads(n):
         )
 
 
+def test_ds_addAll():
+    quads = list(generate_quads(100))
+    ds = Dataset()
+    ds.addAll(sorted(quads, key=lambda q: q.graph) + quads)
+    assert set(ds) == set(quads)
+    for q in quads:
+        assert q in ds
+        assert ds._graphs[q.graph].uri == q.graph
+
+
+def test_ds_match_across_graphs():
+    quads = list(generate_quads(500))
+    ds = Dataset().addAll(quads)
+    quads = set(quads)
+    for q in list(quads)[:50]:
+        for subject, predicate, object in all_patterns(q_as_t(q)):
+            expected = {
+                quad
+                for quad in quads
+                if subject in (None, quad.subject)
+                and predicate in (None, quad.predicate)
+                and object in (None, quad.object)
+            }
+            assert set(ds.match(subject, predicate, object)) == expected
+        assert q_as_t(q) in ds
+
+
+def test_ds_bare_triple_contains():
+    q = Quad(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        Literal("Never!"),
+        NamedNode("http://example.com/graph"),
+    )
+    ds = Dataset()
+    ds.add(q)
+    ds.add(q._replace(graph=NamedNode("http://example.com/graph2")))
+    assert q_as_t(q) in ds
+    ds.remove(q)
+    assert q_as_t(q) in ds
+    ds.remove(q._replace(graph=NamedNode("http://example.com/graph2")))
+    assert q_as_t(q) not in ds
+    assert not ds._spog and not ds._posg and not ds._ospg
+    assert len(ds) == 0
+
+
+def test_ds_indexes_follow_graphs():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        Literal("Never!"),
+    )
+    g = Graph("http://example.com/graph")
+    ds = Dataset()
+    ds.add_graph(g)
+    g.add(t)
+    assert list(ds.match(subject=t.subject)) == [t_as_q(g.uri, t)]
+    assert len(ds) == 1
+    ds.remove_graph(g)
+    assert t not in ds
+    assert list(ds.match(subject=t.subject)) == []
+    g.remove(t)
+    assert len(ds) == 0
+
+
+def test_ds_count():
+    quads = list(generate_quads(500))
+    ds = Dataset().addAll(quads)
+    for q in quads[::4]:
+        ds.remove(q)
+    assert ds.count() == len(ds) == len(set(quads) - set(quads[::4]))
+    for q in quads[:50]:
+        for pattern in all_patterns(q_as_t(q)):
+            assert ds.count(*pattern) == len(list(ds.match(*pattern)))
+            assert ds.count(*pattern, graph=q.graph) == len(
+                list(ds.match(*pattern, graph=q.graph))
+            )
+    expected = {}
+    for q in ds:
+        expected[q.predicate] = expected.get(q.predicate, 0) + 1
+    assert ds.predicate_counts() == expected
+
+
+def test_ds_transaction():
+    ds = Dataset()
+    q1 = Quad(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        en("Never!"),
+        NamedNode("http://example.com/graph"),
+    )
+    q2 = q1._replace(graph=NamedNode("http://example.com/other"))
+    ds.add(q1)
+    with ds.transaction() as tx:
+        tx.remove(q1)
+        tx.add(q2)
+        assert q1 in ds and q2 not in ds
+    assert tx.removed == {q1} and tx.added == {q2}
+    assert list(ds) == [q2]
+    assert ds.count(q1.subject) == 1
+
+
 def test_10000_quads():
     n = 10000
     ds = Dataset()
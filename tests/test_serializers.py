@@ -1,9 +1,31 @@
-from io import StringIO
+import gzip
+from io import BytesIO, StringIO
 import pytest
-
-from pymantic.parsers import ntriples_parser
-from pymantic.primitives import Graph, NamedNode, Triple
-from pymantic.serializers import serialize_ntriples
+import threading
+
+from pymantic.parsers import nquads_parser, ntriples_parser
+import pymantic.parsers.lark as lark_parsers
+from pymantic.primitives import (
+    BlankNode,
+    CompactGraph,
+    Dataset,
+    Graph,
+    Literal,
+    NamedNode,
+    Quad,
+    TermDictionary,
+    Triple,
+)
+from pymantic.serializers import (
+    NTriplesWriter,
+    nt_escape,
+    serialize_nquads,
+    serialize_ntriples,
+    serialize_parallel,
+    serialize_shards,
+)
+
+from .test_turtle import isomorph
 
 
 def test_parse_ntriples_named_nodes():
@@ -36,6 +58,209 @@ def test_parse_ntriples_named_nodes():
     )
 
 
+@pytest.mark.parametrize(
+    ["string", "escaped"],
+    [
+        ("http://example.com/a#b", "http://example.com/a#b"),
+        ('tab\tnl\ncr\rquote"slash\\', 'tab\\tnl\\ncr\\rquote\\"slash\\\\'),
+        ("\b\f\x00\x1f\x7f", "\\b\\f\\u0000\\u001F\\u007F"),
+        ("caf\u00e9 \u4e2d", "caf\\u00E9 \\u4E2D"),
+        ("\U0001F600", "\\U0001F600"),
+    ],
+)
+def test_nt_escape(string, escaped):
+    assert nt_escape(string) == escaped
+
+
+def test_nt_escape_round_trip():
+    value = 'All "sorts" of\tcharacters \\ caf\u00e9\n\U0001F600\x01'
+    triple = Triple(
+        NamedNode("http://example.com/s"),
+        NamedNode("http://example.com/p"),
+        Literal(value),
+    )
+    (parsed,) = ntriples_parser.parse(str(triple))
+    assert parsed.object.value == value
+
+
+def test_ntriples_writer_buffers():
+    class Output(StringIO):
+        writes = 0
+
+        def write(self, s):
+            self.writes += 1
+            return super().write(s)
+
+    triples = [
+        Triple(
+            NamedNode("http://example.com/s"),
+            NamedNode("http://example.com/p"),
+            Literal(str(i)),
+        )
+        for i in range(3000)
+    ]
+    f = Output()
+    with NTriplesWriter(f, buffer_size=10000) as writer:
+        writer.write_all(triples)
+        writer.write(triples[0])
+    assert writer.statements == 3001
+    assert writer.rate > 0
+    assert f.writes < 20
+    assert f.getvalue() == "".join(map(str, triples + triples[:1]))
+
+
+def test_ntriples_writer_binary_sorted_unique():
+    triples = [
+        Triple(
+            NamedNode("http://example.com/s"),
+            NamedNode("http://example.com/p"),
+            Literal(value),
+        )
+        for value in ("caf\u00e9", "b", "a", "b")
+    ]
+    f = BytesIO()
+    with NTriplesWriter(f, unique=True) as writer:
+        writer.write_all(triples)
+    assert f.getvalue() == "".join(map(str, triples[:3])).encode("utf-8")
+    f = BytesIO()
+    with NTriplesWriter(f, sort=True, unique=True) as writer:
+        writer.write_all(triples)
+    assert f.getvalue() == "".join(sorted(map(str, triples[:3]))).encode("utf-8")
+    f = BytesIO()
+    with NTriplesWriter(f, sort=True) as writer:
+        writer.write_all(triples)
+    assert f.getvalue().count(b"\n") == 4
+
+
+def test_serialize_nquads():
+    s = NamedNode("http://example.com/s")
+    p = NamedNode("http://example.com/p")
+    ds = Dataset()
+    ds.add(Quad(s, p, Literal("named"), NamedNode("http://example.com/g")))
+    ds.add(Quad(s, p, Literal("default"), None))
+    f = StringIO()
+    serialize_nquads(ds, f)
+    assert sorted(f.getvalue().splitlines()) == [
+        '<http://example.com/s> <http://example.com/p> "default" .',
+        '<http://example.com/s> <http://example.com/p> "named" '
+        "<http://example.com/g> .",
+    ]
+    for parser in (nquads_parser, lark_parsers.nquads_parser):
+        assert set(parser.parse(f.getvalue())) == set(ds)
+
+
+def parallel_dataset():
+    ds = Dataset()
+    p = NamedNode("http://example.com/p")
+    bnode = BlankNode()
+    for i in range(200):
+        s = NamedNode(f"http://example.com/s/{i}")
+        g = NamedNode(f"http://example.com/g/{i % 3}")
+        ds.add(Quad(s, p, Literal(str(i)), g))
+        ds.add(Quad(s, p, bnode, g))
+    ds.add(Quad(bnode, p, Literal("shared"), None))
+    return ds
+
+
+def assert_same_nquads(text, ds):
+    parsed = nquads_parser.parse(text)
+    assert len(parsed) == len(ds)
+    (bnode,) = {q.object for q in parsed if isinstance(q.object, BlankNode)}
+    assert {q.subject for q in parsed if isinstance(q.subject, BlankNode)} == {bnode}
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+@pytest.mark.parametrize("partition", ["subject", "graph"])
+def test_serialize_parallel(partition, ordered):
+    ds = parallel_dataset()
+    f = StringIO()
+    serialize_parallel(ds, f, workers=2, partition=partition, ordered=ordered)
+    assert_same_nquads(f.getvalue(), ds)
+    if ordered:
+        again = StringIO()
+        serialize_parallel(ds, again, workers=2, partition=partition)
+        assert again.getvalue() == f.getvalue()
+
+
+def test_serialize_parallel_with_threads():
+    ds = parallel_dataset()
+    expected = StringIO()
+    serialize_parallel(ds, expected, workers=2)
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        f = StringIO()
+        serialize_parallel(ds, f, workers=2)
+    finally:
+        stop.set()
+        thread.join()
+    assert f.getvalue() == expected.getvalue()
+
+
+def test_serialize_parallel_from_two_threads():
+    datasets = [parallel_dataset(), parallel_dataset()]
+    expected = []
+    for ds in datasets:
+        f = StringIO()
+        serialize_parallel(ds, f, workers=2)
+        expected.append(f.getvalue())
+    barrier = threading.Barrier(2)
+    results = [[], []]
+
+    def serialize(i):
+        barrier.wait()
+        for _ in range(50):
+            f = StringIO()
+            try:
+                serialize_parallel(datasets[i], f, workers=2)
+            except Exception as e:  # pragma: no cover
+                results[i].append(e)
+            else:
+                results[i].append(f.getvalue())
+
+    threads = [threading.Thread(target=serialize, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [[text] * 50 for text in expected]
+
+
+def test_ntriples_writer_write_formatted():
+    t = Triple(
+        NamedNode("http://example.com/s"),
+        NamedNode("http://example.com/p"),
+        Literal("o"),
+    )
+    f = StringIO()
+    with NTriplesWriter(f) as writer:
+        writer.write(t)
+        writer.write_formatted("<http://a> <http://b> <http://c> .\n", 1)
+    assert writer.statements == 2
+    assert f.getvalue() == str(t) + "<http://a> <http://b> <http://c> .\n"
+
+
+def test_serialize_parallel_graph():
+    g = Graph()
+    p = NamedNode("http://example.com/p")
+    for i in range(100):
+        g.add(Triple(NamedNode(f"http://example.com/s/{i}"), p, Literal(str(i))))
+    f = StringIO()
+    serialize_parallel(g, f, workers=2)
+    assert set(ntriples_parser.parse(f.getvalue())) == set(g)
+
+
+def test_serialize_shards(tmp_path):
+    ds = parallel_dataset()
+    paths = [tmp_path / f"shard{i}.nq.gz" for i in range(3)]
+    counts = serialize_shards(ds, paths, workers=2)
+    assert sum(counts) == len(ds)
+    assert all(counts)
+    text = "".join(gzip.decompress(path.read_bytes()).decode("utf-8") for path in paths)
+    assert_same_nquads(text, ds)
+
+
 @pytest.fixture()
 def turtle_repr():
     from pymantic.serializers import turtle_repr
@@ -343,3 +568,150 @@ def testListSerialization(primitives, profile, turtle_parser, serialize_turtle):
 ex:foo dc:author ("Foo" "Bar" "Baz") ;
        .""".strip()
     )
+
+
+def testBlankNodeAndListSerialization(profile, turtle_parser, serialize_turtle):
+    basic_turtle = """@prefix dc: <http://purl.org/dc/terms/> .
+    @prefix example: <http://example.com/> .
+
+    example:foo dc:author ("Foo" example:bar _:baz) ;
+                dc:subject _:garply .
+    _:garply dc:title "Garply" ;
+             dc:subject _:baz .
+    _:baz dc:title "Baz" ."""
+
+    graph = turtle_parser.parse(basic_turtle)
+    f = StringIO()
+    serialize_turtle(graph=graph, f=f, profile=profile)
+    result = turtle_parser.parse(f.getvalue())
+    assert len(result) == len(graph)
+    assert isomorph(result) == isomorph(graph)
+
+
+def testTermDictionarySerialization(profile, turtle_parser, serialize_turtle):
+    basic_turtle = """@prefix dc: <http://purl.org/dc/terms/> .
+    @prefix example: <http://example.com/> .
+
+    example:foo dc:title "Foo" ;
+                dc:author ("Foo" "Bar") .
+    example:bar dc:title "Bar" ."""
+
+    graph = turtle_parser.parse(basic_turtle)
+    interned = Graph(term_dictionary=TermDictionary())
+    interned.addAll(graph)
+    f = StringIO()
+    serialize_turtle(graph=graph, f=f, profile=profile)
+    interned_f = StringIO()
+    serialize_turtle(graph=interned, f=interned_f, profile=profile)
+    assert interned_f.getvalue() == f.getvalue()
+
+
+@pytest.fixture()
+def ordered_graph(turtle_parser):
+    return turtle_parser.parse(
+        """@prefix dc: <http://purl.org/dc/terms/> .
+        @prefix example: <http://example.com/> .
+
+        example:foo dc:title "Foo" ;
+                    dc:author ("Foo" "Bar") .
+        example:bar dc:title "Bar" ;
+                    dc:subject example:foo .
+        example:baz dc:title "Baz" .
+        example:garply dc:subject example:bar ."""
+    )
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("order", ["index", "external"])
+def testStreamingTurtleOrders(
+    order, compact, profile, turtle_parser, ordered_graph, serialize_turtle
+):
+    profile.setPrefix("ex", NamedNode("http://example.com/"))
+    f = StringIO()
+    serialize_turtle(ordered_graph, f, profile=profile)
+    source = ordered_graph
+    if compact:
+        # Held in several runs and the write buffer.
+        triples = list(ordered_graph)
+        source = CompactGraph().addAll(triples[:-5]).flush()
+        source.addAll(triples[-5:-3]).flush().addAll(triples[-3:])
+        assert len(source._runs) > 1 and source._added
+    streamed = StringIO()
+    serialize_turtle(source, streamed, profile=profile, order=order, run_size=2)
+    if order == "external":
+        assert streamed.getvalue() == f.getvalue()
+    else:
+
+        def blocks(turtle):
+            body = turtle.split("\n", len(profile.prefixes) - 1)[-1]
+            return sorted(body.split("\n\n"))
+
+        assert blocks(streamed.getvalue()) == blocks(f.getvalue())
+
+
+def testStreamingTurtleFromTriples(
+    profile, turtle_parser, ordered_graph, serialize_turtle
+):
+    def triples():
+        yield from sorted(ordered_graph, key=lambda triple: str(triple.subject))
+
+    f = StringIO()
+    serialize_turtle(triples(), f, profile=profile, order="index")
+    result = turtle_parser.parse(f.getvalue())
+    assert isomorph(result) == isomorph(ordered_graph)
+    # The list nodes are written as subjects.
+    assert f.getvalue().count("\n\n") == 6
+
+
+def testUnknownTurtleOrder(ordered_graph, serialize_turtle):
+    with pytest.raises(ValueError):
+        serialize_turtle(ordered_graph, StringIO(), order="random")
+
+
+def testInlineBlankNodeSerialization(profile, turtle_parser, serialize_turtle):
+    graph = turtle_parser.parse(
+        """@prefix ex: <http://example.com/> .
+        @prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+
+        ex:a ex:knows [ ex:name "Bob" ; ex:pets ([ ex:name "Rex" ] (1 2)) ],
+                      [ ex:name "Carol" ] ;
+             ex:shared _:s .
+        ex:b ex:shared _:s ;
+             ex:empty [] ;
+             ex:broken [ rdf:first "x" ; rdf:rest ex:c ] .
+        _:s ex:name "Shared" .
+        _:c1 ex:next _:c2 .
+        _:c2 ex:next _:c1 ."""
+    )
+    profile.setPrefix("ex", NamedNode("http://example.com/"))
+    f = StringIO()
+    serialize_turtle(graph, f, profile=profile)
+    body = f.getvalue().split("\n", len(profile.prefixes) - 1)[-1]
+    assert (
+        body
+        == """_:b0 ex:name "Shared" ;
+     .
+
+ex:a ex:knows [ ex:name "Bob" ;
+                ex:pets ([ ex:name "Rex" ] (1 2)) ],
+              [ ex:name "Carol" ] ;
+     ex:shared _:b0 ;
+     .
+
+ex:b ex:broken [ rdf:first "x" ;
+                 rdf:rest ex:c ] ;
+     ex:empty [] ;
+     ex:shared _:b0 ;
+     .
+
+_:b1 ex:next [ ex:next _:b1 ] ;
+     .
+
+"""
+    )
+    for order in ("name", "index", "external"):
+        f = StringIO()
+        serialize_turtle(graph, f, profile=profile, order=order)
+        result = turtle_parser.parse(f.getvalue())
+        assert len(result) == len(graph)
+        assert isomorph(result) == isomorph(graph)
@@ -0,0 +1,164 @@
+import pytest
+
+from pymantic.primitives import (
+    BlankNode,
+    Dataset,
+    Graph,
+    Literal,
+    NamedNode,
+    Quad,
+    Triple,
+)
+from pymantic.sqlite import SQLiteDataset, SQLiteGraph
+
+from .test_primitives import all_patterns, generate_triples
+
+
+def test_sqlite_graph_matches_graph():
+    triples = list(generate_triples(1000))
+    plain = Graph().addAll(triples)
+    stored = SQLiteGraph().addAll(triples)
+    assert len(stored) == len(plain)
+    assert set(stored) == set(plain)
+    for t in triples[:50]:
+        assert t in stored
+        for pattern in all_patterns(t):
+            assert set(stored.match(*pattern)) == set(plain.match(*pattern))
+            assert stored.count(*pattern) == plain.count(*pattern)
+    assert set(stored.subjects()) == set(plain.subjects())
+    assert set(stored.predicates()) == set(plain.predicates())
+    assert set(stored.objects()) == set(plain.objects())
+    assert stored.predicate_counts() == plain.predicate_counts()
+
+
+def test_sqlite_graph_add_remove():
+    t = Triple(
+        NamedNode("http://example.com"),
+        NamedNode("http://purl.org/dc/terms/issued"),
+        Literal("Never!", "en"),
+    )
+    g = SQLiteGraph()
+    g.add(t).add(t)
+    assert len(g) == 1
+    g.remove(t)
+    assert t not in g
+    with pytest.raises(KeyError):
+        g.remove(t)
+    unknown = NamedNode("http://example.com/unknown")
+    with pytest.raises(KeyError):
+        g.remove(Triple(unknown, unknown, unknown))
+    assert list(g.match(unknown)) == []
+
+
+def test_sqlite_graph_reopen(tmp_path):
+    path = str(tmp_path / "graph.db")
+    triples = list(set(generate_triples(100)))
+    bnode = BlankNode()
+    extra = [
+        Triple(bnode, triples[0].predicate, triples[0].subject),
+        Triple(triples[0].subject, triples[0].predicate, bnode),
+    ]
+    g = SQLiteGraph(path, graph_uri="http://example.com/graph")
+    g.addAll(triples + extra)
+    g.close()
+    g = SQLiteGraph(path, graph_uri="http://example.com/graph")
+    assert set(g) >= set(triples)
+    assert len(g) == len(triples) + 2
+    (subject,) = [t.subject for t in g.match(None, None, triples[0].subject)]
+    assert isinstance(subject, BlankNode)
+    assert [t.object for t in g.match(triples[0].subject, None, None)].count(
+        subject
+    ) == 1
+    assert len(SQLiteGraph(g._db)) == 0
+    g.close()
+
+
+def test_sqlite_graph_transaction():
+    triples = list(set(generate_triples(100)))
+    g = SQLiteGraph().addAll(triples[:50])
+    with g.transaction() as tx:
+        tx.removeMatches(None, None, None)
+        tx.addAll(triples[50:])
+    assert set(g) == set(triples[50:])
+
+
+def test_sqlite_dataset_matches_dataset():
+    quads = [
+        Quad(*t, NamedNode("http://example.com/graph/" + str(i % 3)))
+        for i, t in enumerate(generate_triples(500))
+    ]
+    plain = Dataset().addAll(quads)
+    stored = SQLiteDataset().addAll(quads)
+    assert len(stored) == len(plain)
+    assert set(stored) == set(plain)
+    for q in quads[:30]:
+        assert q in stored
+        assert q[:3] in stored
+        for pattern in all_patterns(Triple(*q[:3])):
+            for graph in (None, q.graph):
+                assert set(stored.match(*pattern, graph)) == set(
+                    plain.match(*pattern, graph)
+                )
+                assert stored.count(*pattern, graph) == plain.count(*pattern, graph)
+    assert {g.uri: set(g) for g in stored.graphs} == {
+        g.uri: set(g) for g in plain.graphs
+    }
+    stored.remove_graph(quads[0].graph)
+    plain.remove_graph(quads[0].graph)
+    assert set(stored) == set(plain)
+
+
+def test_sqlite_dataset_default_graph():
+    triples = list(generate_triples(50))
+    quads = [Quad(*t, None) for t in triples]
+    plain = Dataset().addAll(quads)
+    stored = SQLiteDataset().addAll(quads)
+    assert set(stored) == set(plain)
+    assert all(q.graph is None for q in stored)
+    assert quads[0] in stored
+    assert {g.uri: set(g) for g in stored.graphs} == {
+        g.uri: set(g) for g in plain.graphs
+    }
+    unnamed = stored._graph(None)
+    assert set(unnamed) == set(triples)
+    stored.remove(quads[0])
+    assert quads[0] not in stored
+    assert triples[0] not in unnamed
+
+
+def test_sqlite_dataset_default_and_named_graph():
+    s = NamedNode("http://example.com/s")
+    p = NamedNode("http://example.com/p")
+    named = Quad(s, p, Literal("o"), NamedNode("http://example.com/g"))
+    default = Quad(s, p, Literal("o"), None)
+    ds = SQLiteDataset()
+    ds.add(named)
+    assert default not in ds
+    assert Triple(s, p, Literal("o")) in ds
+    with ds.transaction() as tx:
+        tx.add(default)
+    assert tx.added == {default}
+    assert set(ds) == {named, default}
+    assert ds.count(s, p, None) == 2
+
+
+def test_sqlite_graph_failed_addAll_forgets_blank_nodes():
+    p = NamedNode("http://example.com/p")
+    bnode = BlankNode()
+
+    def triples():
+        yield Triple(bnode, p, Literal("first"))
+        raise ValueError("source failed")
+
+    g = SQLiteGraph()
+    with pytest.raises(ValueError):
+        g.addAll(triples())
+    assert len(g) == 0
+    # The rolled back IDs are given to the next terms stored.
+    other = NamedNode("http://example.com/other")
+    g.add(Triple(other, p, Literal("second")))
+    g.add(Triple(bnode, p, Literal("third")))
+    assert {t.object.value: t.subject for t in g} == {
+        "second": other,
+        "third": bnode,
+    }
@@ -1,3 +1,4 @@
+import io
 import os.path
 import pytest
 from urllib.parse import urljoin
@@ -63,6 +64,12 @@ class TurtleEvalTest(rdf.Resource):
             "rdfs:comment"
         ].value
 
+        # Read a few characters at a time, to split statements everywhere.
+        chunked_graph = turtle_parser.parse(
+            io.BytesIO(in_data), base=base, chunk_size=3
+        )
+        assert isomorph(chunked_graph) == isomorph(compare_graph)
+
 
 @rdf.register_class("rdft:TestTurtlePositiveSyntax")
 class TurtlePositiveSyntaxTest(rdf.Resource):